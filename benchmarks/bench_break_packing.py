@@ -0,0 +1,99 @@
+"""
+Commercial break packing benchmark: greedy single pass vs the bucketed subset-sum packer.
+
+Generates a synthetic pool of ad clips (mostly 15/30/60 second spots with some jitter,
+plus short bumpers), then builds many breaks with each strategy and reports how close
+they land to the random target, how often they fall inside [min, max], and solve time.
+
+Usage: python benchmarks/bench_break_packing.py [--clips 10000] [--breaks 2000] [--min 60] [--max 240]
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import contextlib
+import io
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from commercial_manager import CommercialManager
+
+
+def fake_clips(n):
+    clips = []
+    for i in range(n):
+        kind = random.random()
+        if kind < 0.5: dur = 30 + random.uniform(-1.5, 1.5)
+        elif kind < 0.75: dur = 15 + random.uniform(-1, 1)
+        elif kind < 0.9: dur = 60 + random.uniform(-2, 2)
+        else: dur = random.uniform(4, 12)
+        clips.append((f"ad_{i:05d}.mp4", {"duration": dur}))
+    return clips
+
+
+def greedy_break(clips, min_duration, max_duration):
+    """The original single greedy pass over a shuffled copy of the pool (for comparison)."""
+    target = random.randint(min_duration, max_duration)
+    pool = list(clips)
+    random.shuffle(pool)
+    block, current = [], 0
+    for path, duration in pool:
+        if current + duration <= max_duration:
+            block.append(path)
+            current += duration
+        if current >= min_duration:
+            break
+    return block, target
+
+
+def run(name, build, durations, args):
+    errors, in_window, in_tol, times = [], 0, 0, []
+    for _ in range(args.breaks):
+        start = time.perf_counter()
+        block, target = build()
+        times.append(time.perf_counter() - start)
+        total = sum(durations[p] for p in block)
+        errors.append(abs(total - target))
+        if args.min <= total <= args.max: in_window += 1
+        if abs(total - target) <= args.tolerance: in_tol += 1
+    times.sort()
+    print(f"{name:8s}  mean |error| {sum(errors) / len(errors):7.2f}s   in [min,max] {in_window / args.breaks * 100:5.1f}%   "
+          f"within ±{args.tolerance}s {in_tol / args.breaks * 100:5.1f}%   "
+          f"solve median {times[len(times) // 2] * 1000:6.3f} ms  p99 {times[int(len(times) * 0.99)] * 1000:6.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clips", type=int, default=10000)
+    parser.add_argument("--breaks", type=int, default=2000)
+    parser.add_argument("--min", type=int, default=60)
+    parser.add_argument("--max", type=int, default=240)
+    parser.add_argument("--tolerance", type=int, default=3)
+    args = parser.parse_args()
+
+    random.seed(1)
+    clips = fake_clips(args.clips)
+    durations = {path: info["duration"] for path, info in clips}
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        # Rotation rules off: this measures packing only
+        manager = CommercialManager(os.devnull, tolerance=args.tolerance, min_separation=0, max_plays=None, state_file=None)
+    manager.rng.seed(1)
+    manager._add_clips(clips)
+    print(f"Pool: {len(manager.clips)} clips in {len(manager._buckets)} duration buckets")
+
+    # The greedy pass compares against the target it drew, so it gets the same chance to hit it
+    run("greedy", lambda: greedy_break(manager.clips, args.min, args.max), durations, args)
+
+    def packed():
+        # Re-draw the target the same way generate_break does, by replaying its random call
+        state = manager.rng.getstate()
+        target = manager.rng.randint(args.min, args.max)
+        manager.rng.setstate(state)
+        return manager.generate_break(args.min, args.max), target
+
+    run("packed", packed, durations, args)
+
+
+if __name__ == "__main__":
+    main()
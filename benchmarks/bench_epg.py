@@ -0,0 +1,111 @@
+"""
+EPG benchmark: simulate a week of programming for every channel and export it.
+
+Builds a synthetic library, a commercial pool and a few channels mixing anchors, rotations,
+movies and music videos, then times EPGGenerator.generate() and the XMLTV/JSON export.
+Runs in a temp folder so the real config, history and journal are never touched.
+
+Usage: python benchmarks/bench_epg.py [--shows 300] [--episodes 100] [--channels 6] [--days 7]
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import shutil
+import tempfile
+import contextlib
+import io
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from schedule_engine import ScheduleEngine
+from commercial_manager import CommercialManager
+from media_probe import MediaProbe
+from state_journal import StateJournal
+from epg_generator import EPGGenerator
+
+
+def build_library(args, probe):
+    library = {}
+    for s in range(args.shows):
+        name = f"Show {s:04d}"
+        library[name] = {}
+        for season in range(1, args.episodes // 20 + 2):
+            eps = [os.path.join("D:\\", name, f"Season {season}", f"{name} S{season:02d}E{e:02d}.mkv") for e in range(1, 21)]
+            library[name][season] = eps
+            for ep in eps: probe.cache[ep] = {"duration": random.uniform(1200, 1500)}
+    movies = [os.path.join("D:\\", "Movies", f"Movie {i:04d}.mkv") for i in range(500)]
+    music_videos = [os.path.join("D:\\", "Music Videos", f"Video {i:04d}.mp4") for i in range(2000)]
+    for m in movies: probe.cache[m] = {"duration": random.uniform(5000, 8000)}
+    for mv in music_videos: probe.cache[mv] = {"duration": random.uniform(180, 300)}
+    return library, movies, music_videos
+
+
+def build_config(args, shows):
+    groups = {f"Group {g}": random.sample(shows, 5) for g in range(10)}
+    channels = {}
+    for c in range(args.channels):
+        block = []
+        for _ in range(8):
+            kind = random.random()
+            if kind < 0.4: block.append({"type": "anchor", "show": random.choice(shows), "mode": random.choice(["sequential", "random", "random_no_reruns"]), "count": 2})
+            elif kind < 0.7: block.append({"type": "rotate", "group": random.choice(list(groups)), "mode": "sequential", "count": 1})
+            elif kind < 0.85: block.append({"type": "movie", "count": 1})
+            else: block.append({"type": "music_video", "count": 2})
+        channels[f"Channel {c}"] = {
+            "settings": {"commercial_frequency": 2, "commercial_min_sec": 60, "commercial_max_sec": 180},
+            "schedule_block": block, "bookmarks": {}
+        }
+    return {"paths": {}, "blacklist": [], "active_channel": "Channel 0", "rotation_groups": groups, "channels": channels}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--shows", type=int, default=300)
+    parser.add_argument("--episodes", type=int, default=100)
+    parser.add_argument("--channels", type=int, default=6)
+    parser.add_argument("--days", type=int, default=7)
+    parser.add_argument("--clips", type=int, default=3000)
+    args = parser.parse_args()
+
+    random.seed(1)
+    workdir = tempfile.mkdtemp(prefix="tvblock_epg_")
+    os.chdir(workdir)
+
+    probe = MediaProbe(cache_file=os.path.join(workdir, "probe.json"))
+    library, movies, music_videos = build_library(args, probe)
+    with open("station_config.json", "w") as f: json.dump(build_config(args, list(library)), f)
+
+    scheduler = ScheduleEngine(library, movies, music_videos, journal=StateJournal(os.path.join(workdir, "state.journal")))
+    # Starting up checkpoints the rotation picks, the guide itself mustn't add anything
+    journal_size = os.path.getsize(os.path.join(workdir, "state.journal"))
+    with contextlib.redirect_stdout(io.StringIO()):
+        comm = CommercialManager(os.devnull, probe, state_file=None)
+    comm._add_clips([(f"ad_{i:05d}.mp4", {"duration": random.choice([15, 30, 30, 60]) + random.uniform(-1, 1)}) for i in range(args.clips)])
+
+    total = sum(len(eps) for seasons in library.values() for eps in seasons.values())
+    print(f"Library: {len(library)} shows, {total} episodes, {len(movies)} movies, {len(music_videos)} music videos, {len(comm.clips)} ads")
+
+    start = time.perf_counter()
+    guide = EPGGenerator(scheduler, comm, probe).generate(days=args.days)
+    elapsed = time.perf_counter() - start
+    entries = sum(len(e) for e in guide.values())
+    breaks = sum(1 for e in guide.values() for item in e if item["type"] == "break")
+    print(f"Simulated {args.days} days x {len(guide)} channels: {entries} entries ({breaks} breaks) in {elapsed:.2f}s "
+          f"({elapsed / entries * 1e6:.0f} us/entry)")
+
+    start = time.perf_counter()
+    EPGGenerator.to_xmltv(guide, os.path.join(workdir, "epg.xml"))
+    EPGGenerator.to_json(guide, os.path.join(workdir, "epg.json"))
+    print(f"Export: {time.perf_counter() - start:.2f}s  ({os.path.getsize(os.path.join(workdir, 'epg.xml')) / 1e6:.1f} MB XMLTV)")
+
+    # The live scheduler must come out of this untouched
+    assert scheduler.block_index == 0 and scheduler.items_since_break == 0
+    assert os.path.getsize(os.path.join(workdir, "state.journal")) == journal_size
+    os.chdir(os.path.dirname(workdir))
+    shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Scheduler hot path benchmark: get_next_item throughput and uncached lookahead planning.
+
+Builds a synthetic library and a channel that mixes anchor, rotate, movie and music video
+slots in every playback mode, then pulls items from a ScheduleEngine the way the broadcast
+loop does (cursor and bookmark checkpoints go to a real state journal in a temp dir).
+
+Usage: python benchmarks/bench_get_next_item.py [--shows 200] [--episodes 100] [--items 50000] [--plans 500]
+"""
+import os
+import sys
+import time
+import json
+import shutil
+import argparse
+import tempfile
+import contextlib
+import io
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from schedule_engine import ScheduleEngine
+from state_journal import StateJournal
+
+
+def fake_library(shows, episodes):
+    library = {}
+    for s in range(shows):
+        name = f"Show {s:03d}"
+        library[name] = {f"Season {season}": [os.path.join("media", name, f"Season {season}", f"{name} S{season:02d}E{e:02d}.mkv") for e in range(1, episodes // 4 + 1)]
+                         for season in range(1, 5)}
+    return library
+
+
+def fake_config(shows):
+    block = [
+        {"type": "anchor", "show": "Show 000", "count": 2, "mode": "sequential"},
+        {"type": "rotate", "group": "Sitcoms", "count": 1, "mode": "sequential", "sync_global": True},
+        {"type": "anchor", "show": "Show 001", "count": 1, "mode": "random_no_reruns"},
+        {"type": "music_video", "count": 2, "mode": "random"},
+        {"type": "rotate", "group": "Cartoons", "count": 2, "mode": "random"},
+        {"type": "movie", "count": 1, "mode": "random"},
+    ]
+    return {
+        "active_channel": "Bench",
+        "rotation_groups": {
+            "Sitcoms": [f"Show {s:03d}" for s in range(2, shows, 2)],
+            "Cartoons": [f"Show {s:03d}" for s in range(3, shows, 2)],
+        },
+        "channels": {"Bench": {"settings": {"commercial_frequency": 3, "commercial_min_sec": 60, "commercial_max_sec": 120},
+                               "schedule_block": block, "bookmarks": {}}},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--shows", type=int, default=200)
+    parser.add_argument("--episodes", type=int, default=100)
+    parser.add_argument("--items", type=int, default=50000)
+    parser.add_argument("--plans", type=int, default=500)
+    args = parser.parse_args()
+
+    library = fake_library(args.shows, args.episodes)
+    movies = [os.path.join("media", "movies", f"Movie {i:04d}.mkv") for i in range(500)]
+    music_videos = [os.path.join("media", "mv", f"Video {i:04d}.mp4") for i in range(2000)]
+
+    work_dir = tempfile.mkdtemp(prefix="tvblock_bench_")
+    cwd = os.getcwd()
+    try:
+        # The scheduler reads its history file from the working directory
+        os.chdir(work_dir)
+        with open("station_config.json", "w") as f: json.dump(fake_config(args.shows), f)
+        journal = StateJournal("station_state.journal")
+        with contextlib.redirect_stdout(io.StringIO()):
+            engine = ScheduleEngine(library, movies, music_videos, journal=journal)
+        engine.rng.seed(1)
+
+        start = time.perf_counter()
+        for _ in range(args.items): engine.get_next_item()
+        elapsed = time.perf_counter() - start
+        print(f"get_next_item   {args.items / elapsed:10.0f} items/s   {elapsed / args.items * 1e6:6.2f} us/item")
+
+        # The pick logic alone, no journal writes (what the lookahead and the EPG run)
+        with engine._simulation():
+            start = time.perf_counter()
+            for _ in range(args.items): engine._get_next_item()
+            elapsed = time.perf_counter() - start
+        print(f"pick only       {args.items / elapsed:10.0f} items/s   {elapsed / args.items * 1e6:6.2f} us/item")
+
+        # Lookahead without the plan cache: every call re-simulates the next 10 items
+        start = time.perf_counter()
+        for _ in range(args.plans): engine._get_upcoming_list(10)
+        elapsed = time.perf_counter() - start
+        print(f"plan 10 items   {args.plans / elapsed:10.0f} plans/s   {elapsed / args.plans * 1e6:6.2f} us/plan")
+        journal.close()
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
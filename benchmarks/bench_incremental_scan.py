@@ -0,0 +1,86 @@
+"""
+Cold vs warm library scan benchmark.
+
+Generates a fake TV library (empty files), scans it cold, exports the cache,
+then rescans it using the cache as a warm-start index. One season gets a new
+episode and one episode is moved before the last pass so the delta is visible.
+
+Usage: python benchmarks/bench_incremental_scan.py [--series 200] [--seasons 5] [--episodes 22]
+"""
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+import contextlib
+import io
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from inventory_manager import InventoryManager
+
+
+def build_tree(root, series, seasons, episodes):
+    for s in range(series):
+        for season in range(1, seasons + 1):
+            season_dir = os.path.join(root, f"Show {s:04d}", f"Season {season}")
+            os.makedirs(season_dir)
+            for ep in range(1, episodes + 1):
+                open(os.path.join(season_dir, f"Show {s:04d} - {season}x{ep:02d} - Episode.mkv"), 'w').close()
+
+
+def timed_scan(root, cache_path=None):
+    scanner = InventoryManager()
+    if cache_path: scanner.load_cache(cache_path)
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        library = scanner.scan_series(root)
+    elapsed = time.perf_counter() - start
+    return scanner, library, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--series", type=int, default=200)
+    parser.add_argument("--seasons", type=int, default=5)
+    parser.add_argument("--episodes", type=int, default=22)
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="tvblock_bench_")
+    root = os.path.join(work_dir, "Shows")
+    cache_path = os.path.join(work_dir, "inventory_cache.json")
+    try:
+        build_tree(root, args.series, args.seasons, args.episodes)
+        total = args.series * args.seasons * args.episodes
+        print(f"Generated {total} episodes in {args.series} series")
+
+        # Let the folder mtimes age past the warm-start safety window
+        time.sleep(2.5)
+
+        cold, cold_lib, cold_time = timed_scan(root)
+        with contextlib.redirect_stdout(io.StringIO()):
+            cold.export_cache(cache_path)
+        print(f"Cold scan:  {cold_time * 1000:8.1f} ms  (listed {cold.scan_stats['listed']} folders)")
+
+        warm, warm_lib, warm_time = timed_scan(root, cache_path)
+        assert warm_lib == cold_lib, "warm scan must match the cold scan"
+        print(f"Warm scan:  {warm_time * 1000:8.1f} ms  (listed {warm.scan_stats['listed']}, reused {warm.scan_stats['reused']})")
+
+        # Add one episode and move another between seasons
+        season_1 = os.path.join(root, "Show 0000", "Season 1")
+        season_2 = os.path.join(root, "Show 0000", "Season 2")
+        open(os.path.join(season_1, "Show 0000 - 1x99 - New Episode.mkv"), 'w').close()
+        moved_name = "Show 0001 - 1x01 - Episode.mkv"
+        shutil.move(os.path.join(root, "Show 0001", "Season 1", moved_name), os.path.join(season_2, moved_name))
+
+        changed, _, changed_time = timed_scan(root, cache_path)
+        delta = changed.deltas.get("tv", {})
+        print(f"Changed:    {changed_time * 1000:8.1f} ms  (listed {changed.scan_stats['listed']}, reused {changed.scan_stats['reused']})")
+        print(f"Delta: {len(delta.get('added', []))} added, {len(delta.get('removed', []))} removed, {len(delta.get('moved', []))} moved")
+        if cold_time > 0: print(f"Warm speedup: {cold_time / max(warm_time, 1e-9):.1f}x")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
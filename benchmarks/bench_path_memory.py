@@ -0,0 +1,94 @@
+"""
+Memory benchmark: full path strings vs interned media IDs.
+
+Builds the same { series: { season: [episodes] } } library twice, once with a
+plain list of absolute path strings per season (the classic scan result) and
+once with EpisodeLists backed by a shared PathTable, and reports the traced
+allocation size of each.
+
+Usage: python benchmarks/bench_path_memory.py [--episodes 120000]
+"""
+import os
+import sys
+import time
+import argparse
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from inventory_manager import PathTable, EpisodeList
+
+ROOT = "D:\\Media\\Shows"
+
+
+def entries(total, seasons, per_season):
+    """Yields (series, season, folder, filename) for a fake library of `total` episodes."""
+    count = 0
+    series = 0
+    while count < total:
+        name = f"Some Fairly Long Series Name {series:05d} (1990)"
+        for season in range(1, seasons + 1):
+            folder = f"{ROOT}\\{name}\\Season {season}"
+            for ep in range(1, per_season + 1):
+                yield name, season, folder, f"{name} - {season}x{ep:02d} - The Episode Title Goes Here.mkv"
+                count += 1
+        series += 1
+
+
+def build_plain(args):
+    library = {}
+    for name, season, folder, filename in entries(args.episodes, args.seasons, args.per_season):
+        # Built the same way the scanner builds it
+        library.setdefault(name, {}).setdefault(season, []).append(os.path.join(folder, filename))
+    return library
+
+
+def build_compact(args):
+    table = PathTable()
+    grouped = {}
+    for name, season, folder, filename in entries(args.episodes, args.seasons, args.per_season):
+        grouped.setdefault(name, {}).setdefault(season, []).append((folder, filename))
+    library = {}
+    for name, seasons in grouped.items():
+        library[name] = {season: EpisodeList(table, table.add_many(eps)) for season, eps in seasons.items()}
+    del grouped
+    return library, table
+
+
+def measure(builder, args):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = builder(args)
+    elapsed = time.perf_counter() - start
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, size, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--episodes", type=int, default=120000)
+    parser.add_argument("--seasons", type=int, default=6)
+    parser.add_argument("--per-season", type=int, default=22)
+    args = parser.parse_args()
+
+    plain, plain_size, plain_time = measure(build_plain, args)
+    (compact, table), compact_size, compact_time = measure(build_compact, args)
+
+    total = sum(len(eps) for seasons in plain.values() for eps in seasons.values())
+    print(f"Episodes: {total}  Series: {len(plain)}  Folders: {len(table.dirs)}")
+    print(f"Full paths:   {plain_size / 1e6:8.1f} MB  ({plain_size / total:6.1f} B/episode, built in {plain_time:.2f}s)")
+    print(f"Interned IDs: {compact_size / 1e6:8.1f} MB  ({compact_size / total:6.1f} B/episode, built in {compact_time:.2f}s)")
+    print(f"Saved: {(1 - compact_size / plain_size) * 100:.0f}%")
+
+    # Spot check that expansion gives back the identical strings
+    name = next(iter(plain))
+    assert compact[name][1] == plain[name][1]
+    start = time.perf_counter()
+    for seasons in compact.values():
+        for eps in seasons.values():
+            eps[len(eps) - 1]
+    print(f"Expanding one path per season: {(time.perf_counter() - start) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,63 +1,321 @@
 import os
+import copy
+import json
+import time
+import heapq
 import random
-from tinytag import TinyTag
+import threading
+from media_probe import MediaProbe
+
+ROTATION_FILE = "commercial_rotation.json"
+
+class BreakPlan:
+    """
+    One generated commercial break: the clips in airing order with the durations the packer used.
+    Iterating a plan yields the file paths, so it can be used anywhere the old list of paths was.
+    """
+    __slots__ = ("clips", "target")
+
+    def __init__(self, clips=(), target=0):
+        self.clips = list(clips) # [(filepath, duration_in_seconds)]
+        self.target = target
+
+    @property
+    def paths(self):
+        return [path for path, _ in self.clips]
+
+    @property
+    def durations(self):
+        return [duration for _, duration in self.clips]
+
+    @property
+    def total(self):
+        return sum(duration for _, duration in self.clips)
+
+    def __iter__(self):
+        return iter(self.paths)
+
+    def __len__(self):
+        return len(self.clips)
+
+    def __repr__(self):
+        return f"BreakPlan({len(self.clips)} clips, {self.total:.1f}s)"
 
 class CommercialManager:
-    def __init__(self, commercials_path):
+    def __init__(self, commercials_path, probe=None, background=False, tolerance=3,
+                 min_separation=1800, max_plays=2, cap_window=3600, state_file=ROTATION_FILE, cached_only=False):
         self.commercials_path = commercials_path
+        self.probe = probe if probe else MediaProbe()
         self.clips = [] # Stores tuples: (filepath, duration_in_seconds)
-        self._scan_commercials()
+        self._clip_index = {} # filepath -> position in self.clips
+        # Duration buckets for the break packer: { duration_in_half_seconds: [clip positions] }
+        # Only clips that are allowed to air right now are in a bucket.
+        self._buckets = {}
+        self._bucket_pos = {} # clip position -> its slot inside its bucket list (for O(1) removal)
+        # Clips sitting out their separation / frequency cap: heap of (eligible_at, clip position)
+        self._cooldown = []
+        # How far (in seconds) a break may land from its random target length
+        self.tolerance = tolerance
+
+        # Rotation rules: a clip can't air again within min_separation seconds,
+        # and at most max_plays times in any cap_window seconds (max_plays=None disables the cap)
+        self.min_separation = min_separation
+        self.max_plays = max_plays
+        self.cap_window = cap_window
+        self.state_file = state_file
+        # { filepath: {"count": lifetime plays, "recent": [timestamps inside the cap window]} }
+        self.play_log = self._load_play_log()
+
+        self.rng = random.Random()
+        self._lock = threading.Lock()
+        # Set once every clip has been probed. With background=True breaks can be generated
+        # before that, from whatever has been probed so far.
+        self.ready = threading.Event()
+        self._scan_commercials(background, cached_only)
+
+    def fork(self):
+        """
+        Detached copy of the pool and rotation state for simulations (the EPG). Breaks generated on
+        the copy follow the same packing and rotation rules but never touch the live state or the disk.
+        """
+        with self._lock:
+            twin = copy.copy(self)
+            twin.clips = list(self.clips)
+            twin._buckets = {key: list(idxs) for key, idxs in self._buckets.items()}
+            twin._bucket_pos = dict(self._bucket_pos)
+            twin._cooldown = list(self._cooldown)
+            twin.play_log = {path: {"count": e["count"], "recent": list(e["recent"])} for path, e in self.play_log.items()}
+            twin.rng = random.Random()
+            twin.rng.setstate(self.rng.getstate())
+        twin.state_file = None
+        twin._lock = threading.Lock()
+        return twin
+
+    def _add_clips(self, results):
+        """Makes probed clips eligible for breaks. Called with [(path, info)] batches as they finish."""
+        with self._lock:
+            for full_path, info in results:
+                duration = info.get("duration") if info else None
+                if not duration:
+                    # If a file is unreadable, we skip it
+                    if full_path not in self._clip_index: print(f"Could not read metadata for: {os.path.basename(full_path)}")
+                    continue
+                if full_path in self._clip_index:
+                    # Already added from the cache, refresh the duration in case the file changed
+                    idx = self._clip_index[full_path]
+                    if idx in self._bucket_pos:
+                        self._bucket_remove(idx)
+                        self.clips[idx] = (full_path, duration)
+                        self._bucket_add(idx)
+                    else:
+                        self.clips[idx] = (full_path, duration)
+                else:
+                    idx = len(self.clips)
+                    self._clip_index[full_path] = idx
+                    self.clips.append((full_path, duration))
+                    # Respect plays from before a restart
+                    eligible_at = self._eligible_at(full_path)
+                    if eligible_at > time.time(): heapq.heappush(self._cooldown, (eligible_at, idx))
+                    else: self._bucket_add(idx)
+
+    # Buckets per second. Half-second buckets keep rounding drift small without making the packer slower.
+    BUCKET_RESOLUTION = 2
+
+    def _bucket_key(self, duration):
+        return max(1, int(round(duration * self.BUCKET_RESOLUTION)))
+
+    def _bucket_add(self, idx):
+        bucket = self._buckets.setdefault(self._bucket_key(self.clips[idx][1]), [])
+        self._bucket_pos[idx] = len(bucket)
+        bucket.append(idx)
+
+    def _bucket_remove(self, idx):
+        """Swap-removes a clip from its bucket in O(1)."""
+        bucket = self._buckets[self._bucket_key(self.clips[idx][1])]
+        pos = self._bucket_pos.pop(idx)
+        last = bucket.pop()
+        if last != idx:
+            bucket[pos] = last
+            self._bucket_pos[last] = pos
+
+    # --- ROTATION ---
+    def _load_play_log(self):
+        if self.state_file and os.path.exists(self.state_file):
+            try:
+                with open(self.state_file, 'r') as f: return json.load(f)
+            except Exception as e: print(f"DEBUG: Could not read commercial rotation state: {e}")
+        return {}
+
+    def _save_play_log(self):
+        if not self.state_file: return
+        try:
+            tmp_path = self.state_file + ".tmp"
+            with open(tmp_path, 'w') as f: json.dump(self.play_log, f)
+            os.replace(tmp_path, self.state_file)
+        except Exception as e: print(f"DEBUG: Could not save commercial rotation state: {e}")
+
+    def _eligible_at(self, path, now=None):
+        """Earliest time a clip may air again under the separation and frequency cap rules."""
+        entry = self.play_log.get(path)
+        if not entry or not entry.get("recent"): return 0
+        recent = entry["recent"]
+        eligible_at = recent[-1] + self.min_separation
+        if self.max_plays and len(recent) >= self.max_plays:
+            eligible_at = max(eligible_at, recent[-self.max_plays] + self.cap_window)
+        return eligible_at
+
+    def _record_plays(self, idxs, now):
+        """Logs the clips in a break and benches them until they're eligible again (O(log n) each)."""
+        for idx in idxs:
+            path = self.clips[idx][0]
+            entry = self.play_log.setdefault(path, {"count": 0, "recent": []})
+            entry["count"] += 1
+            # Only keep the timestamps the rules still care about
+            horizon = now - max(self.cap_window, self.min_separation)
+            entry["recent"] = [t for t in entry["recent"] if t > horizon] + [now]
+            self._bucket_remove(idx)
+            heapq.heappush(self._cooldown, (self._eligible_at(path), idx))
+
+    def _release(self, now, force=0):
+        """Moves clips whose cooldown is over back into the buckets. `force` releases that many extra, soonest first."""
+        released = 0
+        while self._cooldown and (self._cooldown[0][0] <= now or released < force):
+            if self._cooldown[0][0] > now: released += 1
+            _, idx = heapq.heappop(self._cooldown)
+            self._bucket_add(idx)
 
-    def _scan_commercials(self):
-        """Scans the folder and caches file durations."""
+    def _scan_commercials(self, background=False, cached_only=False):
+        """
+        Scans the folder and caches file durations. With cached_only only clips already in the probe
+        cache are loaded: no file is opened or stat'ed and the cache isn't saved (the EPG command line tool).
+        """
         if not os.path.exists(self.commercials_path):
             print(f"Warning: Commercial path not found: {self.commercials_path}")
+            self.ready.set()
             return
 
         print("--- Scanning Commercials (This may take a moment to read durations) ---")
         valid_exts = {'.mp4', '.mkv', '.avi', '.mov', '.mpg', '.webm'}
         
+        paths = []
         for root, _, files in os.walk(self.commercials_path):
             for file in files:
                 if os.path.splitext(file)[1].lower() in valid_exts:
-                    full_path = os.path.join(root, file)
-                    try:
-                        # TinyTag reads the metadata for duration
-                        tag = TinyTag.get(full_path)
-                        if tag.duration:
-                            self.clips.append((full_path, tag.duration))
-                    except:
-                        # If a file is unreadable, we skip it
-                        print(f"Could not read metadata for: {file}")
-        
-        print(f"Loaded {len(self.clips)} commercial clips.")
+                    paths.append(os.path.join(root, file))
+
+        if cached_only:
+            self._add_clips([(p, self.probe.cached(p)) for p in paths if (self.probe.cached(p) or {}).get("duration")])
+            self.ready.set()
+            print(f"Loaded {len(self.clips)} cached commercial clips.")
+            return
+
+        if not background:
+            # The probe cache only re-reads files that changed since the last run
+            self._add_clips(self.probe.probe_many(paths))
+            self.probe.save()
+            self.ready.set()
+            print(f"Loaded {len(self.clips)} commercial clips.")
+            return
+
+        # Clips probed on a previous run are usable right away (no disk access at all),
+        # the worker pool then re-validates them and adds the new ones batch by batch
+        self._add_clips([(p, self.probe.cached(p)) for p in paths if (self.probe.cached(p) or {}).get("duration")])
+        print(f"Loaded {len(self.clips)} cached commercial clips, probing {len(paths)} in the background.")
+
+        def worker():
+            self.probe.prefetch(paths, chunk_size=32, on_chunk=self._add_clips).join()
+            self.ready.set()
+            print(f"Loaded {len(self.clips)} commercial clips.")
 
-    def generate_break(self, min_duration=120, max_duration=240):
+        threading.Thread(target=worker, daemon=True).start()
+
+    def generate_break(self, min_duration=120, max_duration=240, tolerance=None, now=None):
         """
-        Returns a list of file paths that sum up to a random time 
+        Returns a BreakPlan whose clips sum up to a random time 
         between min_duration and max_duration.
+        The break is packed to land within `tolerance` seconds of a random target when the pool allows it,
+        using only clips that are clear of their separation and frequency cap.
         """
         if not self.clips:
-            return []
+            return BreakPlan()
 
-        break_block = []
-        current_duration = 0
+        if tolerance is None: tolerance = self.tolerance
+        if now is None: now = time.time()
         
         # Pick a random target for THIS specific break (e.g., 145 seconds)
-        target = random.randint(min_duration, max_duration)
-        
-        # Create a shuffled copy so we don't repeat the same pattern
-        pool = list(self.clips)
-        random.shuffle(pool)
-
-        for path, duration in pool:
-            # If adding this clip keeps us under the max, add it
-            if current_duration + duration <= max_duration:
-                break_block.append(path)
-                current_duration += duration
-            
-            # If we have reached at least the minimum, we can stop early
-            if current_duration >= min_duration:
-                break
-        
-        return break_block
\ No newline at end of file
+        target = self.rng.randint(min_duration, max_duration)
+
+        # The packer works in bucket units rather than seconds
+        res = self.BUCKET_RESOLUTION
+        with self._lock:
+            self._release(now)
+            while True:
+                counts = {key: len(idxs) for key, idxs in self._buckets.items() if idxs and key <= max_duration * res}
+                keys = self._solve_break(target * res, min_duration * res, max_duration * res, int(tolerance * res), counts)
+                # Small pools: if the eligible clips can't fill the minimum, let the ones closest
+                # to eligible back in early rather than airing a short break
+                if sum(keys) >= min_duration * res or not self._cooldown: break
+                self._release(now, force=max(1, len(self._cooldown) // 8))
+
+            # Turn the chosen durations back into random clips from each bucket (no repeats)
+            needed = {}
+            for key in keys: needed[key] = needed.get(key, 0) + 1
+            chosen = []
+            for key, n in needed.items():
+                chosen.extend(self.rng.sample(self._buckets[key], n))
+            self._record_plays(chosen, now)
+            break_block = [self.clips[idx] for idx in chosen]
+
+        self._save_play_log()
+        self.rng.shuffle(break_block)
+        return BreakPlan(break_block, target)
+
+    def _solve_break(self, target, min_duration, max_duration, tolerance, counts):
+        """
+        Bounded subset-sum over the duration buckets (all values in bucket units).
+        `reach` is a bitset of every total that can be built so far, and parent[total]
+        remembers the last duration used to reach it. Each bucket is tried
+        min(count, max // sec) times, so the work depends on the number of distinct durations
+        and the break length, not on the size of the clip pool.
+        Returns the list of bucket durations making up the chosen total.
+        """
+        mask = (1 << (max_duration + 1)) - 1
+        reach = 1
+        parent = {0: None}
+
+        # Any total in [lo, hi] is close enough to stop searching. Only half the tolerance is used here,
+        # the other half absorbs the rounding of real clip lengths into buckets.
+        slack = tolerance // 2
+        lo, hi = max(min_duration + slack, target - slack), min(max_duration - slack, target + slack)
+        if hi < lo: lo, hi = target, target
+        window_bits = ((1 << (hi - lo + 1)) - 1) << lo
+
+        # Shuffle the bucket order so equally good packings come out differently each time
+        order = list(counts.items())
+        self.rng.shuffle(order)
+
+        for sec, count in order:
+            for _ in range(min(count, max_duration // sec)):
+                new = (reach << sec) & mask & ~reach
+                if not new: break
+                reach |= new
+                while new:
+                    low = new & -new
+                    parent[low.bit_length() - 1] = sec
+                    new ^= low
+            if reach & window_bits: break
+
+        # Best total: the buildable length closest to the target inside the min/max window
+        in_window = [t for t in range(min_duration + slack, max_duration - slack + 1) if (reach >> t) & 1]
+        if in_window:
+            best = min(in_window, key=lambda t: abs(t - target))
+        else:
+            # Nothing fits the window, fall back to the longest break under the max
+            best = reach.bit_length() - 1
+
+        durations = []
+        while best > 0:
+            sec = parent[best]
+            durations.append(sec)
+            best -= sec
+        return durations
@@ -0,0 +1,191 @@
+import os
+import json
+import time
+import datetime
+import argparse
+import xml.etree.ElementTree as ET
+
+from schedule_engine import ScheduleEngine
+
+# Length of the "We'll be right back" bumper that opens every break in the broadcast loop
+BUMPER_DURATION = 29
+
+class EPGGenerator:
+    """
+    Programme guide builder.
+
+    Fast-forwards a fork of the scheduler (and of the commercial rotation) through virtual time for
+    every channel, so the guide follows the same picks, rotations and break packing the station will
+    use. Nothing is written to the live state, and durations come from one batched read of the probe
+    cache, so the simulation never opens a media file.
+    """
+    def __init__(self, scheduler, comm_manager=None, probe=None):
+        self.scheduler = scheduler
+        self.comm_manager = comm_manager
+        self.probe = probe
+
+    def generate(self, days=7, start=None, channels=None):
+        """
+        Returns { channel: [entries] }, each entry { type, show, title, path, start, stop } in epoch seconds.
+        Without a start the guide is live: it opens with what the station has on air and plans from its end.
+        """
+        live = start is None
+        start = time.time() if live else start
+        end = start + days * 86400
+        if channels is None: channels = list(self.scheduler.config.get("channels", {}).keys())
+
+        durations = self.probe.duration_table() if self.probe else {}
+
+        guide = {}
+        for channel in channels:
+            on_air = self._on_air(channel, start, durations) if live else None
+            entries = self._simulate_channel(channel, on_air["stop"] if on_air else start, end, durations)
+            guide[channel] = [on_air] + entries if on_air else entries
+        return guide
+
+    def _on_air(self, channel, now, durations):
+        """The entry for the item airing on `channel`, from the station's now_playing checkpoint, or None."""
+        journal = self.scheduler.journal
+        saved = journal.get("now_playing") if journal else None
+        if not saved or saved.get("channel") != channel: return None
+        item = saved.get("item") or {}
+        if not item.get('path'): return None
+
+        kind = self.scheduler.item_kind(item)
+        duration = saved.get("duration") or durations.get(item['path']) or ScheduleEngine.FALLBACK_DURATIONS[kind]
+        # The checkpoint has the position it was at, and when
+        started = saved.get("at", now) - saved.get("time_pos", 0)
+        if started + duration <= now: return None # Left over from before the station stopped
+        return {"type": kind, "show": item['show'], "title": os.path.splitext(item['display'])[0], "path": item['path'],
+                "start": started, "stop": started + duration}
+
+    def _simulate_channel(self, channel, start, end, durations):
+        # Each channel gets its own fork, the simulated plays of one mustn't leak into another
+        engine = self.scheduler.fork(channel)
+        comm = self.comm_manager.fork() if self.comm_manager and hasattr(self.comm_manager, "fork") else None
+
+        entries = []
+        now = start
+        while now < end:
+            engine._sim_now = now # Time-slot channels plan against the clock
+            item = engine._get_next_item()
+            if item['type'] == 'break':
+                if comm and comm.clips: length = comm.generate_break(item['min'], item['max'], item.get('tolerance'), now=now).total
+                else: length = (item['min'] + item['max']) / 2
+                if item.get('bumper', True): length += BUMPER_DURATION
+                # No clip fit the filler break: the station sits the gap out as dead air, and a 0 s entry would never advance
+                elif not length: length = item['min']
+                entry = {"type": "break", "show": "Commercial Break", "title": "", "path": None, "duration": length}
+            else:
+                # An empty block or a block with no playable media would never advance
+                if not item.get('path'): break
+                kind = engine.item_kind(item)
+                duration = durations.get(item['path']) or ScheduleEngine.FALLBACK_DURATIONS[kind]
+                entry = {"type": kind, "show": item['show'], "title": os.path.splitext(item['display'])[0], "path": item['path'], "duration": duration}
+
+                # The station marks an episode watched once it airs, the simulation has to as well
+                engine.record_watch(item['path'], "watched")
+
+            entry["start"] = now
+            now += entry.pop("duration")
+            entry["stop"] = now
+            entries.append(entry)
+        return entries
+
+    # --- EXPORT ---
+    @staticmethod
+    def to_json(guide, path):
+        data = {channel: [dict(e, start=_iso(e["start"]), stop=_iso(e["stop"])) for e in entries] for channel, entries in guide.items()}
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f: json.dump(data, f, indent=2)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def to_xmltv(guide, path):
+        """Writes an XMLTV file. Breaks aren't listed, their time is folded into the programme before them."""
+        tv = ET.Element("tv", {"generator-info-name": "TVBlock"})
+        channel_ids = {channel: _channel_id(channel) for channel in guide}
+        for channel, channel_id in channel_ids.items():
+            ET.SubElement(ET.SubElement(tv, "channel", {"id": channel_id}), "display-name").text = channel
+
+        for channel, entries in guide.items():
+            programmes = []
+            for e in entries:
+                if e["type"] == "break":
+                    if programmes: programmes[-1]["stop"] = e["stop"]
+                    continue
+                programmes.append(dict(e))
+
+            for e in programmes:
+                prog = ET.SubElement(tv, "programme", {"start": _xmltv_time(e["start"]), "stop": _xmltv_time(e["stop"]), "channel": channel_ids[channel]})
+                if e["type"] == "video":
+                    ET.SubElement(prog, "title").text = e["show"]
+                    ET.SubElement(prog, "sub-title").text = e["title"]
+                else:
+                    ET.SubElement(prog, "title").text = e["title"]
+                    ET.SubElement(prog, "category").text = "Movie" if e["type"] == "movie" else "Music"
+
+        tree = ET.ElementTree(tv)
+        if hasattr(ET, "indent"): ET.indent(tree)
+        tmp_path = path + ".tmp"
+        tree.write(tmp_path, encoding="UTF-8", xml_declaration=True)
+        os.replace(tmp_path, path)
+
+
+def _iso(ts):
+    return datetime.datetime.fromtimestamp(ts).astimezone().isoformat(timespec="seconds")
+
+def _xmltv_time(ts):
+    return datetime.datetime.fromtimestamp(ts).astimezone().strftime("%Y%m%d%H%M%S %z")
+
+def _channel_id(name):
+    return "".join(ch if ch.isalnum() else "-" for ch in name.lower()).strip("-") + ".tvblock"
+
+
+def main():
+    """Builds the guide from the saved inventory and state, without starting the station."""
+    from inventory_store import InventoryStore
+    from commercial_manager import CommercialManager
+    from media_probe import MediaProbe
+    from state_journal import StateJournal
+
+    parser = argparse.ArgumentParser(description="Export a programme guide for every channel.")
+    parser.add_argument("--days", type=int, default=7)
+    parser.add_argument("--out", default="epg", help="Output path without extension (writes .xml and .json)")
+    parser.add_argument("--config", default="station_config.json")
+    parser.add_argument("--db", default="inventory.db")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db):
+        print(f"No inventory at {args.db}, start the station once to scan the library.")
+        return
+    with InventoryStore.open_readonly(args.db) as store: tv, movies, music_videos = store.load_library()
+
+    with open(args.config, 'r') as f: config = json.load(f)
+    probe = MediaProbe()
+    # Reads the station's files but never writes them: the config, the journal and the probe cache stay as they are
+    scheduler = ScheduleEngine(tv, movies, music_videos, config_file=args.config, journal=StateJournal(read_only=True),
+                               probe=probe, read_only=True)
+    comm_path = config.get("paths", {}).get("commercials", "")
+    # Same separation and play caps as the station, so breaks are packed the way they'll air
+    rules = config.get("commercial_rules", {})
+    comm = CommercialManager(
+        comm_path, probe,
+        min_separation=rules.get("min_separation_sec", 1800),
+        max_plays=rules.get("max_plays_per_window", 2),
+        cap_window=rules.get("window_sec", 3600),
+        cached_only=True
+    ) if comm_path and os.path.exists(comm_path) else None
+
+    start = time.perf_counter()
+    guide = EPGGenerator(scheduler, comm, probe).generate(days=args.days)
+    elapsed = time.perf_counter() - start
+    print(f"Simulated {args.days} days on {len(guide)} channels ({sum(len(e) for e in guide.values())} entries) in {elapsed:.2f}s")
+
+    EPGGenerator.to_xmltv(guide, args.out + ".xml")
+    EPGGenerator.to_json(guide, args.out + ".json")
+    print(f"Wrote {args.out}.xml and {args.out}.json")
+
+
+if __name__ == "__main__":
+    main()
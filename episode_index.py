@@ -0,0 +1,140 @@
+import os
+from suffix_index import SuffixIndex
+
+
+class ShowEpisodes:
+    """One show flattened into airing order (seasons then file names), blacklisted episodes removed."""
+    __slots__ = ("episodes", "position", "all_episodes", "_suffix")
+
+    def __init__(self, episodes, all_episodes=None):
+        self.episodes = episodes
+        self.all_episodes = all_episodes if all_episodes is not None else episodes # Blacklisted ones included
+        # path -> index in self.episodes
+        self.position = {path: i for i, path in enumerate(episodes)}
+        self._suffix = None
+
+    @property
+    def suffix(self):
+        """SuffixIndex over the playable episodes, built the first time an override needs it."""
+        if self._suffix is None: self._suffix = SuffixIndex(self.episodes)
+        return self._suffix
+
+    def __len__(self):
+        return len(self.episodes)
+
+
+class WatchState:
+    """
+    Which of a show's episodes have been watched, by position in its ShowEpisodes array.
+
+    watched is a bitmap, last is the highest watched position (-1 if none), and unwatched is a
+    list with a position map so an episode can be swapped out in O(1) and one can be sampled
+    uniformly with random.choice.
+    """
+    __slots__ = ("watched", "last", "unwatched", "_unwatched_pos")
+
+    def __init__(self, size):
+        self.watched = bytearray(size)
+        self.last = -1
+        self.unwatched = list(range(size))
+        self._unwatched_pos = {i: i for i in range(size)}
+
+    def mark(self, i, watched):
+        if bool(self.watched[i]) == watched: return
+        self.watched[i] = 1 if watched else 0
+        if watched:
+            # Swap-remove from the unwatched list
+            slot = self._unwatched_pos.pop(i)
+            tail = self.unwatched.pop()
+            if tail != i:
+                self.unwatched[slot] = tail
+                self._unwatched_pos[tail] = slot
+            if i > self.last: self.last = i
+        else:
+            self._unwatched_pos[i] = len(self.unwatched)
+            self.unwatched.append(i)
+            if i == self.last:
+                # Rare (a watched episode was re-aired and skipped), walk down to the next watched one
+                i -= 1
+                while i >= 0 and not self.watched[i]: i -= 1
+                self.last = i
+
+
+class EpisodeIndex:
+    """
+    Flattened, blacklist-filtered episode arrays for the scheduler.
+
+    A show is flattened the first time it's asked for and kept until something that affects it changes:
+    invalidate(shows) after a library delta, set_blacklist() after a config reload (only the shows that
+    own a toggled episode are dropped). Picking an episode is then just an index into a list.
+    """
+    def __init__(self, library, blacklist=(), history_log=None):
+        self.library = library
+        self.blacklist = set(blacklist)
+        # The scheduler's history["playback_log"] ({ filename: entry }), used to seed WatchStates
+        self.history_log = history_log if history_log is not None else {}
+        self._shows = {}
+        self._watch = {} # show name -> WatchState, built on first use
+        self._show_of = {} # path -> show name, for every episode of every built show (blacklisted ones too)
+
+    def get(self, show_name):
+        """Returns the ShowEpisodes for a show (empty if it isn't in the library)."""
+        entry = self._shows.get(show_name)
+        if entry is None:
+            entry = self._build(show_name)
+            self._shows[show_name] = entry
+        return entry
+
+    def episodes(self, show_name):
+        return self.get(show_name).episodes
+
+    def watch_state(self, show_name):
+        """Returns the WatchState for a show, seeding it from the playback log the first time."""
+        state = self._watch.get(show_name)
+        if state is None:
+            episodes = self.get(show_name).episodes
+            state = WatchState(len(episodes))
+            for i, ep in enumerate(episodes):
+                entry = self.history_log.get(os.path.basename(ep))
+                if entry and entry.get("status") == "watched": state.mark(i, True)
+            self._watch[show_name] = state
+        return state
+
+    def record_play(self, path, status):
+        """Updates the watch state of whatever built show owns this episode (called after each history write)."""
+        show_name = self._show_of.get(path)
+        state = self._watch.get(show_name)
+        if state is None: return
+        i = self._shows[show_name].position.get(path)
+        if i is not None: state.mark(i, status == "watched")
+
+    def _build(self, show_name):
+        series_data = self.library.get(show_name)
+        if not series_data: return ShowEpisodes([])
+        flat_eps = []
+        for season in sorted(series_data.keys()): flat_eps.extend(sorted(series_data[season]))
+        for ep in flat_eps: self._show_of[ep] = show_name
+        return ShowEpisodes([ep for ep in flat_eps if ep not in self.blacklist], flat_eps)
+
+    def invalidate(self, shows=None):
+        """Drops the cached arrays for the given shows, or for everything when shows is None."""
+        if shows is None:
+            self._shows.clear()
+            self._show_of.clear()
+            self._watch.clear()
+            return
+        for show_name in shows:
+            self._watch.pop(show_name, None)
+            entry = self._shows.pop(show_name, None)
+            if entry is None: continue
+            for path in entry.all_episodes:
+                if self._show_of.get(path) == show_name: del self._show_of[path]
+
+    def set_blacklist(self, blacklist):
+        """Swaps in a new blacklist, invalidating only the shows whose episodes were toggled. Returns those shows."""
+        new_blacklist = set(blacklist)
+        toggled = new_blacklist ^ self.blacklist
+        self.blacklist = new_blacklist
+        affected = {self._show_of[path] for path in toggled if path in self._show_of}
+        if affected: self.invalidate(affected)
+        return affected
@@ -1,11 +1,122 @@
 import os
 import re
+import stat
 import json
 import time
+import sys
+import threading
+from array import array
 from pathlib import Path
+from collections.abc import Sequence
+from concurrent.futures import ThreadPoolExecutor
 
-class InventoryManager:
+from inventory_store import InventoryStore
+
+class PathTable:
+    """
+    Interned storage for media paths.
+    Each file becomes an integer media ID: a folder prefix stored once per folder plus the
+    file name packed into one shared UTF-8 buffer, instead of a full path string per episode.
+    """
     def __init__(self):
+        self.dirs = []                  # dir_id -> folder path (interned)
+        self._dir_ids = {}              # folder path -> dir_id
+        self._dir_files = []            # dir_id -> array of the media IDs inside that folder
+        self.dir_of = array('I')        # media_id -> dir_id
+        self._names = bytearray()       # every file name, back to back
+        self._ends = array('Q', [0])    # media_id -> end offset of its name in _names
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.dir_of)
+
+    def add_many(self, entries):
+        """Interns a batch of (folder, file name) pairs and returns their media IDs. Existing files keep their ID."""
+        ids = []
+        with self._lock:
+            known = {}  # per-batch name lookup for the folders touched by this batch
+            for folder, name in entries:
+                dir_id = self._dir_ids.get(folder)
+                if dir_id is None:
+                    dir_id = len(self.dirs)
+                    folder = sys.intern(folder)
+                    self.dirs.append(folder)
+                    self._dir_ids[folder] = dir_id
+                    self._dir_files.append(array('I'))
+                if dir_id not in known:
+                    known[dir_id] = {self.basename(i): i for i in self._dir_files[dir_id]}
+                media_id = known[dir_id].get(name)
+                if media_id is None:
+                    media_id = len(self.dir_of)
+                    self.dir_of.append(dir_id)
+                    self._names += name.encode('utf-8', 'surrogatepass')
+                    self._ends.append(len(self._names))
+                    self._dir_files[dir_id].append(media_id)
+                    known[dir_id][name] = media_id
+                ids.append(media_id)
+        return ids
+
+    def id_of(self, path):
+        """Returns the media ID for a full path, or None if it was never interned."""
+        folder, name = os.path.split(path)
+        dir_id = self._dir_ids.get(folder)
+        if dir_id is None: return None
+        for media_id in self._dir_files[dir_id]:
+            if self.basename(media_id) == name: return media_id
+        return None
+
+    def basename(self, media_id):
+        return self._names[self._ends[media_id]:self._ends[media_id + 1]].decode('utf-8', 'surrogatepass')
+
+    def path(self, media_id):
+        """Expands a media ID back into the full path (the same string the scanner would have built)."""
+        return os.path.join(self.dirs[self.dir_of[media_id]], self.basename(media_id))
+
+class EpisodeList(Sequence):
+    """
+    Array-backed list of media IDs that reads like a list of paths.
+    Paths are only built when an item is actually read, so existing code that
+    iterates or indexes a season keeps working unchanged.
+    """
+    __slots__ = ("table", "ids")
+
+    def __init__(self, table, ids):
+        self.table = table
+        self.ids = array('I', ids)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.table.path(i) for i in self.ids[index]]
+        return self.table.path(self.ids[index])
+
+    def __iter__(self):
+        path = self.table.path
+        for media_id in self.ids:
+            yield path(media_id)
+
+    def __contains__(self, path):
+        media_id = self.table.id_of(path)
+        return media_id is not None and media_id in self.ids
+
+    def __eq__(self, other):
+        if isinstance(other, EpisodeList) and other.table is self.table:
+            return self.ids == other.ids
+        if isinstance(other, (list, tuple, EpisodeList)):
+            return len(self) == len(other) and list(self) == list(other)
+        return NotImplemented
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        return result if result is NotImplemented else not result
+
+    def __repr__(self):
+        return f"EpisodeList({list(self)!r})"
+
+class InventoryManager:
+    def __init__(self, workers=1, verbose=True, compact=False):
         # Regex to find "Season 1", "S01", "s1", etc.
         self.season_pattern = re.compile(r"(?:season|s)[\s\.]*(\d)", re.IGNORECASE)
         # Regex to find "1x01", "2x10", etc. inside a filename
@@ -13,12 +124,199 @@ class InventoryManager:
         
         # Extensions we consider valid media files
         self.valid_extensions = {'.mkv', '.mp4', '.avi', '.mov', '.m4v'}
+
+        # Number of series folders walked at once (1 = serial). Network shares spend most of
+        # each listdir waiting on the round-trip, so a few threads hide that latency.
+        self.workers = max(1, int(workers))
+        # Background rescans turn this off so the console isn't flooded every poll
+        self.verbose = verbose
+
+        # Compact mode stores seasons as EpisodeLists of interned media IDs instead of path strings
+        self.compact = compact
+        self.paths = PathTable()
+        self._lock = threading.Lock()
         
         # Library storage for caching
         self.tv_library = {}
         self.movie_library = []
         self.music_video_library = []
 
+        # Warm-start index: { dir_path: [mtime, [subdirs], [files]] }
+        # Loaded from a previous export so unchanged folders don't have to be re-listed
+        self._warm = {}
+        self._warm_index = {}
+        self._warm_time = 0
+        self._scan_started = time.time()
+        self._dir_index = {}
+        # Which SQLite store the warm-start data matches, so export_store can write just the delta
+        self._warm_store = None
+        self._exported_store = None
+        self.deltas = {}
+        self.scan_stats = {"listed": 0, "reused": 0}
+
+    def load_cache(self, cache_path="inventory_cache.json"):
+        """Loads a previous export as a warm-start index for incremental rescans."""
+        if not os.path.exists(cache_path):
+            return False
+        try:
+            with open(cache_path, 'r') as f:
+                data = json.load(f)
+        except Exception as e:
+            print(f"DEBUG: Could not read inventory cache, doing a full scan: {e}")
+            return False
+
+        # JSON turns the integer season keys into strings, so convert them back
+        tv = {}
+        for series_name, seasons in data.get("tv", {}).items():
+            tv[series_name] = {int(num): eps for num, eps in seasons.items()}
+
+        self._set_warm(tv, data.get("movies", []), data.get("music_videos", []), data.get("dir_index", {}), float(data.get("scan_started", 0)))
+        print(f"DEBUG: Loaded warm-start index ({len(self._warm_index)} folders)")
+        return True
+
+    def load_store(self, store_path="inventory.db"):
+        """Loads the warm-start index from the SQLite inventory store."""
+        if not os.path.exists(store_path):
+            return False
+        try:
+            with InventoryStore.open_readonly(store_path) as store:
+                tv, movies, music_videos = store.load_library()
+                dir_index = store.load_dir_index()
+                scan_started = float(store.get_meta("scan_started", 0))
+        except Exception as e:
+            print(f"DEBUG: Could not read inventory store, doing a full scan: {e}")
+            return False
+
+        self._set_warm(tv, movies, music_videos, dir_index, scan_started)
+        self._warm_store = store_path
+        print(f"DEBUG: Loaded warm-start index from {store_path} ({len(self._warm_index)} folders)")
+        return True
+
+    def warm_from(self, previous):
+        """Uses another scanner's results as the warm-start index (no disk round-trip)."""
+        self._set_warm(previous.tv_library, previous.movie_library, previous.music_video_library, previous._dir_index, previous._scan_started)
+        self._warm_store = previous._exported_store or previous._warm_store
+        # Share the interned paths so unchanged episodes keep their media IDs across rescans
+        self.paths = previous.paths
+        self.compact = previous.compact
+
+    def _set_warm(self, tv, movies, music_videos, dir_index, scan_started):
+        self._warm = {"tv": tv, "movies": movies, "music_videos": music_videos}
+        self._warm_index = dir_index
+        self._warm_time = scan_started
+
+    def has_changes(self, category=None):
+        """True if the last incremental scan found added, removed or moved files."""
+        categories = [category] if category else list(self.deltas.keys())
+        for cat in categories:
+            delta = self.deltas.get(cat, {})
+            if delta.get("added") or delta.get("removed") or delta.get("moved"):
+                return True
+        return False
+
+    def _list_dir(self, path, follow_links=True):
+        """
+        Returns (subdirs, files) for a folder.
+        If the folder's mtime matches the warm-start index, the cached listing is reused
+        and the folder is never re-listed (one stat instead of a full listdir).
+        With follow_links=False a symlinked folder comes back empty, checked with the same single stat.
+        """
+        try:
+            st = os.stat(path) if follow_links else os.lstat(path)
+        except OSError:
+            return [], []
+        if stat.S_ISLNK(st.st_mode): return [], []
+        mtime = st.st_mtime
+
+        cached = self._warm_index.get(path)
+        # Don't trust mtimes that landed right before the previous scan started, a file could have
+        # been added within the same timestamp tick after that folder was listed
+        if cached and cached[0] == mtime and mtime < self._warm_time - 2:
+            with self._lock:
+                self._dir_index[path] = cached
+                self.scan_stats["reused"] += 1
+            return cached[1], cached[2]
+
+        dirs, files = [], []
+        try:
+            with os.scandir(path) as it:
+                for entry in it:
+                    if entry.is_dir():
+                        dirs.append(entry.name)
+                    else:
+                        files.append(entry.name)
+        except OSError as e:
+            print(f"DEBUG: Could not list {path}: {e}")
+            return [], []
+
+        with self._lock:
+            self._dir_index[path] = [mtime, dirs, files]
+            self.scan_stats["listed"] += 1
+        return dirs, files
+
+    def _walk(self, top, follow_links=True):
+        """
+        Top-down equivalent of os.walk that goes through the warm-start index. Like os.walk it lists
+        symlinked folders in dirs but doesn't descend into them (no loops, no files indexed twice).
+        """
+        dirs, files = self._list_dir(top, follow_links)
+        yield top, dirs, files # A symlinked folder comes through empty
+        for name in dirs:
+            yield from self._walk(os.path.join(top, name), follow_links=False)
+
+    def _map(self, func, items):
+        """
+        Runs func over items on the worker pool (or serially when workers == 1).
+        Results are returned in the same order as items, so a parallel scan builds
+        exactly what the serial scan would.
+        """
+        if self.workers > 1 and len(items) > 1:
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                return list(pool.map(func, items))
+        return [func(item) for item in items]
+
+    def _diff_paths(self, old_paths, new_paths):
+        """
+        Compares two scans of the same library.
+        Returns { "added": [...], "removed": [...], "moved": [(old, new), ...] }
+        A file counts as moved when it disappeared in one place and a file with the same name appeared in another.
+        """
+        old_set, new_set = set(old_paths), set(new_paths)
+        added = [p for p in new_paths if p not in old_set]
+        removed = [p for p in old_paths if p not in new_set]
+
+        removed_by_name = {}
+        for p in removed:
+            removed_by_name.setdefault(os.path.basename(p), []).append(p)
+
+        moved = []
+        still_added = []
+        for p in added:
+            candidates = removed_by_name.get(os.path.basename(p))
+            if candidates:
+                moved.append((candidates.pop(0), p))
+            else:
+                still_added.append(p)
+
+        moved_from = {old for old, _ in moved}
+        return {
+            "added": still_added,
+            "removed": [p for p in removed if p not in moved_from],
+            "moved": moved
+        }
+
+    def _record_delta(self, category, old_paths, new_paths):
+        """Stores the delta against the warm-start index (only when one was loaded)."""
+        if not self._warm:
+            return
+        delta = self._diff_paths(old_paths, new_paths)
+        self.deltas[category] = delta
+        if self.verbose or self.has_changes(category):
+            print(f"DEBUG: {category} delta: {len(delta['added'])} added, {len(delta['removed'])} removed, {len(delta['moved'])} moved")
+
+    def _flatten_tv(self, library):
+        return [ep for seasons in library.values() for season in sorted(seasons) for ep in seasons[season]]
+
     def scan_series(self, library_path):
         """
         Scans a root folder for TV Series.
@@ -30,20 +328,22 @@ class InventoryManager:
             print(f"Error: Path not found: {library_path}")
             return library
 
-        print(f"--- Scanning TV Library: {library_path} ---")
+        if self.verbose: print(f"--- Scanning TV Library: {library_path} ---")
 
         # Loop through each folder in the root (Each folder is a Series)
-        for series_name in os.listdir(library_path):
-            series_path = os.path.join(library_path, series_name)
+        series_dirs, _ = self._list_dir(library_path)
+        series_paths = [os.path.join(library_path, name) for name in series_dirs]
 
-            if os.path.isdir(series_path):
-                series_data = self._process_seasons(series_path)
-                
-                # Only add the series if we actually found episodes
-                if series_data:
-                    library[series_name] = series_data
-                    print(f"Found Series: {series_name} ({len(series_data)} seasons)")
+        # One task per series folder, results come back in folder order
+        results = self._map(self._process_seasons, series_paths)
 
+        for series_name, series_data in zip(series_dirs, results):
+            # Only add the series if we actually found episodes
+            if series_data:
+                library[series_name] = series_data
+                if self.verbose: print(f"Found Series: {series_name} ({len(series_data)} seasons)")
+
+        self._record_delta("tv", self._flatten_tv(self._warm.get("tv", {})), self._flatten_tv(library))
         self.tv_library = library
         return library
 
@@ -51,18 +351,18 @@ class InventoryManager:
         """Helper function to find seasons within a series folder"""
         seasons = {}
 
-        for item in os.listdir(series_path):
+        season_dirs, _ = self._list_dir(series_path)
+        for item in season_dirs:
             item_path = os.path.join(series_path, item)
 
-            if os.path.isdir(item_path):
-                # Check if folder name matches "Season X" or "SXX"
-                match = self.season_pattern.search(item)
-                if match:
-                    season_num = int(match.group(1)) # Convert "01" to 1
-                    episodes = self._find_episodes(item_path)
-                    
-                    if episodes:
-                        seasons[season_num] = episodes
+            # Check if folder name matches "Season X" or "SXX"
+            match = self.season_pattern.search(item)
+            if match:
+                season_num = int(match.group(1)) # Convert "01" to 1
+                episodes = self._find_episodes(item_path)
+                
+                if episodes:
+                    seasons[season_num] = episodes
         
         return seasons
 
@@ -70,7 +370,7 @@ class InventoryManager:
         """Helper to find and sort episode files within a season folder"""
         episodes = []
 
-        for root, _, files in os.walk(season_path):
+        for root, _, files in self._walk(season_path):
             for filename in files:
                 # Check file extension
                 if Path(filename).suffix.lower() in self.valid_extensions:
@@ -78,17 +378,19 @@ class InventoryManager:
                     # Check if file has [SxEE] format
                     match = self.episode_pattern.search(filename)
                     if match:
-                        # We store a tuple: (EpisodeNumber, FullPath)
+                        # We store a tuple: (EpisodeNumber, Folder, FileName)
                         # We use the tuple to sort by number, then strip it later
                         ep_num = int(match.group(2))
-                        full_path = os.path.join(root, filename)
-                        episodes.append((ep_num, full_path))
+                        episodes.append((ep_num, root, filename))
 
         # Sort by episode number (the first item in the tuple)
         episodes.sort(key=lambda x: x[0])
 
+        if self.compact:
+            return EpisodeList(self.paths, self.paths.add_many([(x[1], x[2]) for x in episodes]))
+
         # Return just the list of paths, now sorted
-        return [x[1] for x in episodes]
+        return [os.path.join(x[1], x[2]) for x in episodes]
 
     def scan_movies(self, movies_path):
         """
@@ -97,29 +399,36 @@ class InventoryManager:
         Returns list of movie paths.
         """
         movies = []
-        print(f"\n--- Scanning Movie Library: {movies_path} ---")
+        if self.verbose: print(f"\n--- Scanning Movie Library: {movies_path} ---")
         
         if not os.path.exists(movies_path):
             print(f"Error: Path not found: {movies_path}")
             return movies
 
-        for item in os.listdir(movies_path):
-            item_path = os.path.join(movies_path, item)
-            
-            # If it's a folder, look inside for the media file
-            if os.path.isdir(item_path):
-                for file in os.listdir(item_path):
-                    if Path(file).suffix.lower() in self.valid_extensions:
-                        movies.append(os.path.join(item_path, file))
-                        break # Found one file, assume it's the movie and move on
+        movie_dirs, _ = self._list_dir(movies_path)
+        movie_paths = [os.path.join(movies_path, item) for item in movie_dirs]
+
+        # Each folder holds one movie, look inside for the media file
+        for movie_file in self._map(self._find_movie_file, movie_paths):
+            if movie_file:
+                movies.append(movie_file)
         
-        print(f"Found {len(movies)} movies.")
+        if self.verbose: print(f"Found {len(movies)} movies.")
+        self._record_delta("movies", self._warm.get("movies", []), movies)
         self.movie_library = movies
         return movies
 
+    def _find_movie_file(self, item_path):
+        """Returns the first media file inside a movie folder, or None."""
+        _, files = self._list_dir(item_path)
+        for file in files:
+            if Path(file).suffix.lower() in self.valid_extensions:
+                return os.path.join(item_path, file) # Found one file, assume it's the movie and move on
+        return None
+
     def scan_music_videos(self, path):
         """Scans a directory for music video files."""
-        print(f"DEBUG: Scanning Music Videos in {path}")
+        if self.verbose: print(f"DEBUG: Scanning Music Videos in {path}")
         music_videos = []
         valid_exts = ('.mp4', '.mkv', '.avi', '.mov', '.m4v')
         
@@ -127,27 +436,58 @@ class InventoryManager:
             self.music_video_library = music_videos
             return music_videos
             
-        for root, dirs, files in os.walk(path):
+        for root, dirs, files in self._walk(path):
             for file in files:
                 if file.lower().endswith(valid_exts):
                     music_videos.append(os.path.join(root, file))
                     
-        print(f"DEBUG: Found {len(music_videos)} Music Videos")
+        if self.verbose: print(f"DEBUG: Found {len(music_videos)} Music Videos")
+        self._record_delta("music_videos", self._warm.get("music_videos", []), music_videos)
         self.music_video_library = music_videos
         return music_videos
 
+    def export_store(self, store_path="inventory.db"):
+        """
+        Writes the library to the SQLite inventory store (read by the Discord bot).
+        If this scan was warm-started from the same store only the changed shows, lists
+        and folders are written, all inside one transaction.
+        """
+        meta = {"scan_started": self._scan_started, "last_updated": time.time()}
+        try:
+            with InventoryStore(store_path) as store:
+                if self._warm_store == store_path:
+                    old_tv = self._warm["tv"]
+                    store.apply_delta(
+                        changed_series={name: seasons for name, seasons in self.tv_library.items() if old_tv.get(name) != seasons},
+                        removed_series=[name for name in old_tv if name not in self.tv_library],
+                        movies=self.movie_library if self.has_changes("movies") else None,
+                        music_videos=self.music_video_library if self.has_changes("music_videos") else None,
+                        # Reused listings are the exact same objects as in the warm index
+                        dir_index={path: entry for path, entry in self._dir_index.items() if self._warm_index.get(path) is not entry},
+                        removed_dirs=[path for path in self._warm_index if path not in self._dir_index],
+                        meta=meta
+                    )
+                else:
+                    store.replace_all(self.tv_library, self.movie_library, self.music_video_library, self._dir_index, meta)
+            self._exported_store = store_path
+            if self.verbose: print(f"DEBUG: Inventory store updated: {store_path}")
+        except Exception as e:
+            print(f"ERROR: Failed to export inventory store: {e}")
+
     def export_cache(self, output_path="inventory_cache.json"):
         """Exports the current library state to a JSON file for external use (e.g. Discord Bot)."""
         cache_data = {
             "tv": self.tv_library,
             "movies": self.movie_library,
             "music_videos": self.music_video_library,
+            "dir_index": self._dir_index,
+            "scan_started": self._scan_started,
             "last_updated": str(time.time())
         }
         
         try:
             with open(output_path, 'w') as f:
-                json.dump(cache_data, f, indent=4)
-            print(f"DEBUG: Inventory cache exported to {output_path}")
+                json.dump(cache_data, f, indent=4, default=list)
+            if self.verbose: print(f"DEBUG: Inventory cache exported to {output_path}")
         except Exception as e:
             print(f"ERROR: Failed to export inventory cache: {e}")
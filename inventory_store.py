@@ -0,0 +1,207 @@
+import os
+import json
+import sqlite3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS series (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS seasons (
+    id INTEGER PRIMARY KEY,
+    series_id INTEGER NOT NULL REFERENCES series(id) ON DELETE CASCADE,
+    number INTEGER NOT NULL,
+    UNIQUE (series_id, number)
+);
+CREATE TABLE IF NOT EXISTS episodes (
+    id INTEGER PRIMARY KEY,
+    season_id INTEGER NOT NULL REFERENCES seasons(id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    path TEXT NOT NULL UNIQUE,
+    basename TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_episodes_season ON episodes(season_id, position);
+CREATE INDEX IF NOT EXISTS idx_episodes_basename ON episodes(basename);
+CREATE TABLE IF NOT EXISTS movies (
+    id INTEGER PRIMARY KEY,
+    position INTEGER NOT NULL,
+    path TEXT NOT NULL UNIQUE,
+    basename TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_movies_basename ON movies(basename);
+CREATE TABLE IF NOT EXISTS music_videos (
+    id INTEGER PRIMARY KEY,
+    position INTEGER NOT NULL,
+    path TEXT NOT NULL UNIQUE,
+    basename TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_music_videos_basename ON music_videos(basename);
+CREATE TABLE IF NOT EXISTS dir_index (
+    path TEXT PRIMARY KEY,
+    mtime REAL NOT NULL,
+    dirs TEXT NOT NULL,
+    files TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+MEDIA_TABLES = ("movies", "music_videos")
+
+class InventoryStore:
+    """
+    SQLite copy of the library for the Discord bot and for warm-start rescans.
+
+    Every write runs inside a single transaction and the database is in WAL mode,
+    so a reader (the bot) always sees either the old or the new library, never half of it.
+    Use InventoryStore.open_readonly() from anything that only needs to look things up.
+    """
+    def __init__(self, db_path="inventory.db", read_only=False):
+        self.db_path = db_path
+        self.read_only = read_only
+        if read_only:
+            # mode=ro makes sqlite refuse any write, so the bot can't lock or corrupt the store
+            uri = "file:" + os.path.abspath(db_path).replace("\\", "/") + "?mode=ro"
+            self.conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        else:
+            self.conn = sqlite3.connect(db_path, check_same_thread=False)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+            self.conn.executescript(SCHEMA)
+        self.conn.execute("PRAGMA foreign_keys=ON")
+
+    @classmethod
+    def open_readonly(cls, db_path="inventory.db"):
+        return cls(db_path, read_only=True)
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # --- WRITES ---
+    def replace_all(self, tv, movies, music_videos, dir_index=None, meta=None):
+        """Rewrites the whole store in one transaction (first export or a full rescan)."""
+        with self.conn:
+            self.conn.execute("DELETE FROM episodes")
+            self.conn.execute("DELETE FROM seasons")
+            self.conn.execute("DELETE FROM series")
+            for name, seasons in tv.items():
+                self._insert_series(name, seasons)
+            for table, paths in zip(MEDIA_TABLES, (movies, music_videos)):
+                self.conn.execute(f"DELETE FROM {table}")
+                self._insert_media(table, paths)
+            if dir_index is not None:
+                self.conn.execute("DELETE FROM dir_index")
+                self._upsert_dirs(dir_index)
+            self._write_meta(meta)
+
+    def apply_delta(self, changed_series=None, removed_series=None, movies=None, music_videos=None, dir_index=None, removed_dirs=None, meta=None):
+        """
+        Applies an incremental update in one transaction.
+        changed_series: { "Series Name": { SeasonNumber: [paths] } } for shows that were added or changed
+        removed_series: names of shows that are gone
+        movies / music_videos: the new full list (only passed when that category changed)
+        dir_index: only the folder entries that were re-listed
+        removed_dirs: folders in the stored index that this scan didn't visit (deleted or moved away)
+        """
+        with self.conn:
+            for name in (removed_series or []):
+                self.conn.execute("DELETE FROM series WHERE name = ?", (name,))
+            for name, seasons in (changed_series or {}).items():
+                self.conn.execute("DELETE FROM series WHERE name = ?", (name,))
+                self._insert_series(name, seasons)
+            for table, paths in zip(MEDIA_TABLES, (movies, music_videos)):
+                if paths is None: continue
+                self.conn.execute(f"DELETE FROM {table}")
+                self._insert_media(table, paths)
+            if dir_index: self._upsert_dirs(dir_index)
+            if removed_dirs: self.conn.executemany("DELETE FROM dir_index WHERE path = ?", [(path,) for path in removed_dirs])
+            self._write_meta(meta)
+
+    def _insert_series(self, name, seasons):
+        series_id = self.conn.execute("INSERT INTO series (name) VALUES (?)", (name,)).lastrowid
+        for number, episodes in seasons.items():
+            season_id = self.conn.execute("INSERT INTO seasons (series_id, number) VALUES (?, ?)", (series_id, int(number))).lastrowid
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO episodes (season_id, position, path, basename) VALUES (?, ?, ?, ?)",
+                [(season_id, pos, path, os.path.basename(path)) for pos, path in enumerate(episodes)]
+            )
+
+    def _insert_media(self, table, paths):
+        self.conn.executemany(
+            f"INSERT OR REPLACE INTO {table} (position, path, basename) VALUES (?, ?, ?)",
+            [(pos, path, os.path.basename(path)) for pos, path in enumerate(paths)]
+        )
+
+    def _upsert_dirs(self, dir_index):
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO dir_index (path, mtime, dirs, files) VALUES (?, ?, ?, ?)",
+            [(path, entry[0], json.dumps(entry[1]), json.dumps(entry[2])) for path, entry in dir_index.items()]
+        )
+
+    def _write_meta(self, meta):
+        if meta:
+            self.conn.executemany("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", [(k, str(v)) for k, v in meta.items()])
+
+    # --- READS ---
+    def get_meta(self, key, default=None):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def list_series(self):
+        return [row[0] for row in self.conn.execute("SELECT name FROM series ORDER BY id")]
+
+    def get_series(self, name):
+        """Returns { SeasonNumber: [paths] } for one show, or {} if it isn't in the library."""
+        seasons = {}
+        rows = self.conn.execute(
+            "SELECT seasons.number, episodes.path FROM series "
+            "JOIN seasons ON seasons.series_id = series.id "
+            "JOIN episodes ON episodes.season_id = seasons.id "
+            "WHERE series.name = ? ORDER BY seasons.id, episodes.position", (name,)
+        )
+        for number, path in rows:
+            seasons.setdefault(number, []).append(path)
+        return seasons
+
+    def find_episodes(self, basename):
+        """Looks an episode file up by name. Returns a list of (series, season, path)."""
+        return self.conn.execute(
+            "SELECT series.name, seasons.number, episodes.path FROM episodes "
+            "JOIN seasons ON seasons.id = episodes.season_id "
+            "JOIN series ON series.id = seasons.series_id "
+            "WHERE episodes.basename = ?", (basename,)
+        ).fetchall()
+
+    def find_media(self, table, basename):
+        """Looks a movie or music video up by file name. Returns the full path or None."""
+        if table not in MEDIA_TABLES: raise ValueError(f"Unknown media table: {table}")
+        row = self.conn.execute(f"SELECT path FROM {table} WHERE basename = ?", (basename,)).fetchone()
+        return row[0] if row else None
+
+    def list_media(self, table):
+        if table not in MEDIA_TABLES: raise ValueError(f"Unknown media table: {table}")
+        return [row[0] for row in self.conn.execute(f"SELECT path FROM {table} ORDER BY position")]
+
+    def load_library(self):
+        """Returns (tv, movies, music_videos) in the same shape the InventoryManager scans produce."""
+        tv = {}
+        rows = self.conn.execute(
+            "SELECT series.name, seasons.number, episodes.path FROM series "
+            "JOIN seasons ON seasons.series_id = series.id "
+            "JOIN episodes ON episodes.season_id = seasons.id "
+            "ORDER BY series.id, seasons.id, episodes.position"
+        )
+        for name, number, path in rows:
+            tv.setdefault(name, {}).setdefault(number, []).append(path)
+        return tv, self.list_media("movies"), self.list_media("music_videos")
+
+    def load_dir_index(self):
+        return {path: [mtime, json.loads(dirs), json.loads(files)] for path, mtime, dirs, files in self.conn.execute("SELECT path, mtime, dirs, files FROM dir_index")}
@@ -0,0 +1,69 @@
+import os
+import time
+import threading
+
+from inventory_manager import InventoryManager
+
+class LibraryWatcher:
+    """
+    Background thread that notices new, deleted and moved media files.
+
+    Every poll re-runs the incremental scan against the previous poll's mtime snapshot,
+    so an idle library costs one stat per folder. When something changed, on_change is
+    called with { "tv": {...}, "movies": [...], "music_videos": [...], "deltas": {...} }
+    for the categories that changed.
+    """
+    def __init__(self, paths, on_change, interval=30, workers=1, seed_scanner=None, store_path=None):
+        self.paths = paths
+        self.on_change = on_change
+        self.interval = interval
+        self.workers = workers
+        self.store_path = store_path
+        self._previous = seed_scanner
+        self._stop = threading.Event()
+        self.thread = None
+
+    def start(self):
+        if self.thread or self.interval <= 0: return
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        print(f"DEBUG: Library watcher polling every {self.interval}s")
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.poll()
+            except Exception as e:
+                print(f"DEBUG: Library watcher poll failed: {e}")
+
+    def poll(self):
+        """Runs one incremental scan and reports the changes. Returns True if anything changed."""
+        scanner = InventoryManager(workers=self.workers, verbose=False)
+        if self._previous: scanner.warm_from(self._previous)
+
+        tv_path = self.paths.get("tv", "")
+        mov_path = self.paths.get("movies", "")
+        mv_path = self.paths.get("music_videos", "")
+        if tv_path and os.path.exists(tv_path): scanner.scan_series(tv_path)
+        if mov_path and os.path.exists(mov_path): scanner.scan_movies(mov_path)
+        if mv_path and os.path.exists(mv_path): scanner.scan_music_videos(mv_path)
+
+        first_poll = self._previous is None
+        self._previous = scanner
+        if first_poll or not scanner.has_changes() or self._stop.is_set(): return False
+
+        update = {"deltas": scanner.deltas}
+        if scanner.has_changes("tv"): update["tv"] = scanner.tv_library
+        if scanner.has_changes("movies"): update["movies"] = scanner.movie_library
+        if scanner.has_changes("music_videos"): update["music_videos"] = scanner.music_video_library
+
+        start = time.time()
+        self.on_change(update)
+        print(f"DEBUG: Library watcher applied changes in {(time.time() - start) * 1000:.1f} ms")
+
+        # Keep the warm-start index current so the next launch doesn't relist these folders
+        if self.store_path: scanner.export_store(self.store_path)
+        return True
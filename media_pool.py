@@ -0,0 +1,65 @@
+import os
+from episode_index import ShowEpisodes, WatchState
+
+
+class MediaPool(ShowEpisodes):
+    """
+    The movie or music video library, indexed for the scheduler and the GUI.
+
+    Looks like one flattened show to the scheduler (episodes in scan order, position by path, a
+    SuffixIndex for override_start), so every slot mode works the same way it does for shows.
+    by_name maps file names to paths for the GUI's lists and for slots saved by file name.
+    One pool is shared by the station, the GUI and the scheduler; replace() swaps the contents
+    in place, so nobody has to rebuild their own map after a library change.
+    """
+    __slots__ = ("name", "by_name", "_watch")
+
+    def __init__(self, paths=(), name=None):
+        self.name = name # Shuffle bag key
+        self.replace(paths)
+
+    def replace(self, paths):
+        """Swaps in a new path list. The indexes are built aside and assigned last, readers never see half of one."""
+        episodes = list(paths)
+        position = {path: i for i, path in enumerate(episodes)}
+        by_name = {os.path.basename(path): path for path in episodes}
+        self.by_name, self.position, self._suffix, self._watch = by_name, position, None, None
+        self.episodes = self.all_episodes = episodes
+
+    def __iter__(self):
+        return iter(self.episodes)
+
+    def __contains__(self, path):
+        return path in self.position
+
+    def names(self):
+        return sorted(self.by_name)
+
+    def resolve(self, ref):
+        """A full path or a file name to a path in the pool, or None."""
+        if not ref: return None
+        if ref in self.position: return ref
+        return self.by_name.get(os.path.basename(ref))
+
+    def watch_state(self, history_log):
+        """WatchState over the pool, seeded from the playback log ({ filename: entry }) the first time."""
+        state = self._watch
+        if state is None:
+            state = WatchState(len(self.episodes))
+            for i, path in enumerate(self.episodes):
+                entry = history_log.get(os.path.basename(path))
+                if entry and entry.get("status") == "watched": state.mark(i, True)
+            self._watch = state
+        return state
+
+    def record_play(self, path, status):
+        i = self.position.get(path)
+        if self._watch is not None and i is not None: self._watch.mark(i, status == "watched")
+
+    def copy(self):
+        """Shares the indexes (they're never mutated, only replaced) but not the watch state, for forks."""
+        twin = MediaPool.__new__(MediaPool)
+        twin.name, twin.by_name, twin.position, twin._suffix = self.name, self.by_name, self.position, self._suffix
+        twin.episodes = twin.all_episodes = self.episodes
+        twin._watch = None
+        return twin
@@ -0,0 +1,126 @@
+import os
+import json
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from tinytag import TinyTag
+
+PROBE_CACHE_FILE = "media_probe_cache.json"
+
+class MediaProbe:
+    """
+    The one place that reads media headers.
+
+    Results are cached on disk keyed by path and validated against the file's size and mtime,
+    so a file is only opened again after it changes. Entries look like:
+    { "size": ..., "mtime": ..., "duration": seconds, "width": ..., "height": ...,
+      "audio": { "channels": ..., "samplerate": ..., "bitrate": ... } }
+    """
+    def __init__(self, cache_file=PROBE_CACHE_FILE, workers=4):
+        self.cache_file = cache_file
+        self.workers = max(1, int(workers))
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._dirty = False
+        self._last_save = time.time()
+        self.version = 0 # Bumped whenever an entry is added or replaced, for callers that copy durations out
+        self._pool = ThreadPoolExecutor(max_workers=self.workers)
+        self.cache = self._load()
+
+    def _load(self):
+        if os.path.exists(self.cache_file):
+            try:
+                with open(self.cache_file, 'r') as f: return json.load(f)
+            except Exception as e: print(f"DEBUG: Could not read probe cache, starting fresh: {e}")
+        return {}
+
+    def save(self):
+        """Writes the cache if anything new was probed (temp file + rename, so it's never half written)."""
+        with self._save_lock:
+            with self._lock:
+                if not self._dirty: return
+                data = json.dumps(self.cache)
+                self._dirty = False
+                self._last_save = time.time()
+            try:
+                tmp_path = self.cache_file + ".tmp"
+                with open(tmp_path, 'w') as f: f.write(data)
+                os.replace(tmp_path, self.cache_file)
+            except Exception as e: print(f"DEBUG: Could not save probe cache: {e}")
+
+    def cached(self, path):
+        """Returns the cached entry without touching the disk (may be stale or None)."""
+        return self.cache.get(path)
+
+    def probe(self, path):
+        """Returns the info dict for a file, reading its headers only if the cached entry is missing or stale."""
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+
+        entry = self.cache.get(path)
+        if entry and entry.get("size") == st.st_size and entry.get("mtime") == st.st_mtime:
+            return entry
+
+        entry = {"size": st.st_size, "mtime": st.st_mtime, "duration": None, "width": None, "height": None, "audio": {}}
+        try:
+            tag = TinyTag.get(path)
+            entry["duration"] = tag.duration
+            entry["audio"] = {"channels": tag.channels, "samplerate": tag.samplerate, "bitrate": tag.bitrate}
+            # TinyTag only reads container/audio headers, video size is filled when a tag provides it
+            entry["width"] = getattr(tag, "width", None)
+            entry["height"] = getattr(tag, "height", None)
+        except Exception:
+            # Unreadable files are cached too, so we don't retry them on every call
+            pass
+
+        with self._lock:
+            self.cache[path] = entry
+            self._dirty = True
+            self.version += 1
+        return entry
+
+    def duration(self, path, default=None):
+        entry = self.probe(path)
+        if entry and entry.get("duration"): return entry["duration"]
+        return default
+
+    def cached_duration(self, path, default=None):
+        entry = self.cache.get(path)
+        if entry and entry.get("duration"): return entry["duration"]
+        return default
+
+    def duration_table(self, paths=None):
+        """{ path: seconds } for everything in the cache with a known duration, copied in one pass (no disk access)."""
+        with self._lock:
+            if paths is None: items = list(self.cache.items())
+            else: items = [(p, self.cache.get(p)) for p in paths]
+        return {path: entry["duration"] for path, entry in items if entry and entry.get("duration")}
+
+    def probe_many(self, paths):
+        """Probes a batch on the worker pool. Returns [(path, entry)] in the same order."""
+        if self.workers > 1 and len(paths) > 1:
+            entries = list(self._pool.map(self.probe, paths))
+        else:
+            entries = [self.probe(p) for p in paths]
+        return list(zip(paths, entries))
+
+    def prefetch(self, paths, chunk_size=256, on_chunk=None):
+        """
+        Fills the cache in the background. Paths that are already cached are still stat'ed
+        (to catch changed files) but their headers aren't re-read.
+        on_chunk is called with each [(path, entry)] batch as it finishes.
+        """
+        paths = list(paths)
+
+        def worker():
+            for i in range(0, len(paths), chunk_size):
+                results = self.probe_many(paths[i:i + chunk_size])
+                if on_chunk: on_chunk(results)
+                if time.time() - self._last_save > 60: self.save()
+            self.save()
+
+        thread = threading.Thread(target=worker, daemon=True)
+        thread.start()
+        return thread
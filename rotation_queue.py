@@ -0,0 +1,67 @@
+import heapq
+
+
+class RotationQueue:
+    """
+    Least-recently-aired picker for one rotation group, with optional weights.
+
+    Stride scheduling over a heap: every show has a pass value, a pick takes the show with the
+    lowest one and advances it by 1 / weight. With equal weights that's plain least-recently-aired
+    (never-aired shows first, ties by name), a weight of 2 airs a show twice as often. A pick is
+    one heap pop and push, O(log n), and only ever uses the picked show's state, so each pick can
+    be checkpointed as one small record. No randomness: the lookahead and the EPG see the same
+    order the station will air.
+    """
+    __slots__ = ("heap", "state", "weights", "tick")
+
+    def __init__(self, members=(), weights=None, saved=None):
+        self.state = {} # show -> [pass, tick it last aired at (-1 = never)]
+        self.heap = []
+        self.weights = {}
+        self.tick = 0
+        self.sync(members, weights, saved)
+
+    def __len__(self):
+        return len(self.state)
+
+    def sync(self, members, weights=None, saved=None):
+        """
+        Sets the group's members and weights, keeping the standing of shows that stay.
+        `saved` is checkpointed state ({ show: [pass, tick] }) to fall back on. O(n), only run on edits.
+        """
+        saved = saved or {}
+        entries = {}
+        for show in members:
+            entry = self.state.get(show) or saved.get(show)
+            if entry: entries[show] = [entry[0], entry[1]]
+        # Newcomers join level with the furthest-behind member, so they don't get a run of catch-up airings
+        base = min((entry[0] for entry in entries.values()), default=0)
+        self.state = {show: entries.get(show) or [base, -1] for show in members}
+
+        weights = weights or {}
+        self.weights = {show: w for show, w in weights.items() if show in self.state and isinstance(w, (int, float)) and w > 0}
+        self.tick = max((entry[1] for entry in self.state.values()), default=-1) + 1
+        self.heap = [(entry[0], entry[1], show) for show, entry in self.state.items()]
+        heapq.heapify(self.heap)
+
+    def pick(self):
+        """Returns (show, its new [pass, tick]) for the least recently aired member, or (None, None)."""
+        heap = self.heap
+        while heap:
+            pass_value, last, show = heapq.heappop(heap)
+            entry = self.state.get(show)
+            if entry is None or entry[0] != pass_value or entry[1] != last: continue # Left over from a sync
+            # A new list rather than an update, copies share the entries
+            entry = self.state[show] = [pass_value + 1.0 / self.weights.get(show, 1), self.tick]
+            self.tick += 1
+            heapq.heappush(heap, (entry[0], entry[1], show))
+            return show, entry
+        return None, None
+
+    def copy(self):
+        twin = RotationQueue.__new__(RotationQueue) # Skip the O(n) sync in __init__
+        twin.state = dict(self.state)
+        twin.heap = list(self.heap)
+        twin.weights = self.weights
+        twin.tick = self.tick
+        return twin
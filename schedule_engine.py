@@ -1,17 +1,100 @@
 import os
+import copy
 import random
 import json
-from tinytag import TinyTag
+import time
+import bisect
+import datetime
+import threading
+from contextlib import contextmanager
+from episode_index import EpisodeIndex
+from media_pool import MediaPool
+from shuffle_bag import ShuffleBag
+from rotation_queue import RotationQueue
+from state_journal import StateJournal
+from schedule_model import SlotType, PlayMode, ScheduleConfigError, compile_schedule, compile_channel
+
+class ChannelCursor:
+    """Where one channel is in its schedule. Each channel keeps its own, so switching is a dict lookup."""
+    __slots__ = ("block_index", "slot_play_count", "items_since_break", "last_anchor", "rotations", "overrides_done", "version", "plan_cache", "on_air_until")
+
+    def __init__(self, saved=None):
+        saved = saved or [0, 0, 0]
+        self.block_index, self.slot_play_count, self.items_since_break = saved[:3]
+        self.last_anchor = saved[3] if len(saved) > 3 else None
+        self.rotations = {} # rotate slot index -> show it's currently airing
+        self.overrides_done = set() # Compiled slots whose override_start has been used up
+        self.version = 0 # Bumped on every pick from this channel
+        self.plan_cache = None # (engine version, cursor version, limit, plan)
+        self.on_air_until = None # When the item get_next_item last handed out should end (wall clock)
+
+    def as_list(self):
+        return [self.block_index, self.slot_play_count, self.items_since_break, self.last_anchor]
+
+    def copy(self):
+        twin = ChannelCursor(self.as_list())
+        twin.rotations = dict(self.rotations)
+        twin.overrides_done = set(self.overrides_done)
+        return twin
+
+
+def _cursor_field(name):
+    # The engine's trackers read and write the active channel's cursor
+    return property(lambda self: getattr(self.cursor, name), lambda self, value: setattr(self.cursor, name, value))
+
 
 class ScheduleEngine:
-    def __init__(self, library, movie_library=[], music_video_library=[], config_file="station_config.json", active_channel=None):
+    block_index = _cursor_field("block_index")
+    slot_play_count = _cursor_field("slot_play_count")
+    items_since_break = _cursor_field("items_since_break")
+    last_anchor = _cursor_field("last_anchor")
+
+    # Used by the lookahead when a file's duration isn't known yet
+    FALLBACK_DURATIONS = {"video": 1320, "movie": 5400, "music_video": 240}
+
+    def __init__(self, library, movie_library=[], music_video_library=[], config_file="station_config.json", active_channel=None, journal=None, probe=None, read_only=False):
         self.library = library
-        self.movie_library = movie_library
-        self.music_video_library = music_video_library
+        # MediaPools shared with the station (plain path lists are wrapped)
+        self.movie_library = movie_library if isinstance(movie_library, MediaPool) else MediaPool(movie_library)
+        self.music_video_library = music_video_library if isinstance(music_video_library, MediaPool) else MediaPool(music_video_library)
+        self.movie_library.name, self.music_video_library.name = "movies", "music_videos"
         self.config_file = config_file
+        # Never writes the config file (the EPG command line tool, which also passes a read-only journal)
+        self.read_only = read_only
+        # Optional MediaProbe, the lookahead reads real durations from its cache
+        self.probe = probe
+        # Every pick goes through this generator, so the lookahead can replay it exactly
+        self.rng = random.Random()
+
+        # Lookahead caches live on each ChannelCursor. This is bumped whenever anything shared
+        # by every channel (config, library, watch history) changes.
+        self._version = 0
+        self._simulating = False
+        self._sim_bookmarks = {}
+        self._sim_last_watched = {}
+        # Shuffle bags for the random modes ("show:<name>", "movies", "music_videos") and the
+        # least-recently-aired queue of each rotation group, built on first use. Simulations work on
+        # copies in _sim_bags / _sim_queues; a fork carries a snapshot of their journal state in _detached.
+        self.bags = {}
+        self.rotation_queues = {}
+        self._sim_bags = {}
+        self._sim_queues = {}
+        self._detached = {}
+        # Virtual wall clock for simulations of time-slot channels (None = real time)
+        self._sim_now = None
+
+        # Time-slot channels: the music video durations the filler draws from, sorted (built on first use).
+        # The last anchor that aired is kept on the channel's cursor.
+        self._filler_pool = None
+        
+        # Guards the library containers and playback trackers. The broadcast loop, the GUI,
+        # the IPC server and the library watcher all touch them from different threads.
+        self.lock = threading.RLock()
         
         self.config = self._load_json(config_file)
         self.history = self._load_json("station_history.json")
+        # Bookmarks and the playback cursor live here, the config is only written when the user edits it
+        self.journal = journal if journal else StateJournal()
         
         # 1. Automatic Network Migration
         if "channels" not in self.config:
@@ -31,33 +114,98 @@ class ScheduleEngine:
             self._save_config()
 
         self.rotation_groups = self.config.get("rotation_groups", {})
+        # Optional { group: { show: weight } }, a show with weight 2 comes round twice as often
+        self.rotation_weights = self.config.get("rotation_weights", {})
+
+        # The channels compiled into Slot objects. A channel with mistakes in it is left out (and
+        # airs nothing) until it's fixed, the problems are listed in config_errors.
+        self.channels, self.config_errors = compile_schedule(self.config)
+        for error in self.config_errors: print(f"DEBUG: Schedule config error: {error}")
+        self.last_reload_ms = None
+
+        # Flattened per-show episode arrays, rebuilt only for shows that change
+        self.history.setdefault("playback_log", {})
+        self.episode_index = EpisodeIndex(self.library, self.config.get("blacklist", []), self.history["playback_log"])
         
-        # Tracking variables
-        self.block_index = 0
-        self.slot_play_count = 0
-        self.items_since_break = 0
+        # Tracking variables, one resident cursor per channel that has been on air
+        self.cursors = {}
+        self.cursor = self._cursor_for(self.active_channel)
         
-        self._resolve_all_rotations()
+        self._resolve_rotations(self.active_channel)
 
     # --- NEW: HOT RELOAD ---
-    def hot_reload(self):
-        """Reloads config from disk while preserving playback trackers, unless the channel changed."""
-        new_config = self._load_json(self.config_file)
-        
-        # 1. Check if we are swapping to a completely new channel
-        new_active = new_config.get("active_channel", self.active_channel)
-        if new_active != self.active_channel:
-            self.active_channel = new_active
-            self.block_index = 0
-            self.slot_play_count = 0
-            self.items_since_break = 0
+    def hot_reload(self, inserted=None):
+        """
+        Reloads config from disk while preserving playback trackers, unless the channel changed.
+        A channel that doesn't validate keeps its last good schedule (or stays off the air if it never
+        had one) and its problems go in config_errors. Raises ScheduleConfigError, and changes nothing,
+        only if the channel that will be on air is one of them.
+
+        Only what differs from the running config is rebuilt: channels whose dict changed are
+        recompiled (the rest are reused), rotation picks are re-checked only for changed channels
+        and groups, and the blacklist swap touches only the shows that own a toggled episode.
+        The time taken is kept in last_reload_ms. inserted is (channel, index) when the only edit
+        is a slot put in at index (inject_slot), so the rotation picks behind it stay with their slots.
+        """
+        start = time.perf_counter()
+        with self.lock:
+            new_config = self._load_json(self.config_file)
+            channels, errors = compile_schedule(new_config, self.channels)
+            broken = [name for name in new_config.get("channels", {}) if name not in channels]
+            if new_config.get("active_channel", self.active_channel) in broken: raise ScheduleConfigError(errors)
+            for name in broken:
+                if name in self.channels: channels[name] = self.channels[name]
+            for error in errors: print(f"DEBUG: Schedule config error: {error}")
+
+            changed = {name for name in channels.keys() | self.channels.keys() if channels.get(name) is not self.channels.get(name)}
+            self._carry_rotations(self.channels, channels, changed, inserted)
             
-        self.config = new_config
-        self.rotation_groups = self.config.get("rotation_groups", {})
-        self._resolve_all_rotations()
+            self.config = new_config
+            self.channels = channels
+            self.config_errors = errors
+            changed_groups = self._swap_rotation_groups(new_config.get("rotation_groups", {}), new_config.get("rotation_weights", {}))
+            toggled_shows = self.episode_index.set_blacklist(self.config.get("blacklist", []))
+
+            # 1. Switching channels just swaps cursors, every channel resumes where it left off
+            new_active = new_config.get("active_channel", self.active_channel)
+            if new_active != self.active_channel:
+                self.switch_channel(new_active)
+            elif self.active_channel in changed or changed_groups:
+                self._resolve_rotations(self.active_channel)
         
-        # 2. Safety bounds check in case the user deleted slots from the current channel
-        new_block = self._get_channel_data().get("schedule_block", [])
+            # 2. Safety bounds check in case the user deleted slots from the current channel
+            self._check_cursor_bounds()
+
+            # 3. Stale lookahead plans: only the edited channels', unless something every channel reads changed
+            if changed_groups or toggled_shows: self._version += 1
+            for name in changed:
+                if name not in channels and name != self.active_channel: self.cursors.pop(name, None) # Deleted
+                elif name in self.cursors: self.cursors[name].plan_cache = None
+
+        self.last_reload_ms = (time.perf_counter() - start) * 1000
+        print(f"DEBUG: Hot reload in {self.last_reload_ms:.1f} ms ({len(changed)} of {len(channels)} channels rebuilt)")
+
+    def switch_channel(self, channel):
+        """Puts another channel on air. Its cursor stays resident, so this is O(1) after the first visit."""
+        with self.lock:
+            self.active_channel = channel
+            self.cursor = self._cursor_for(channel)
+            self._resolve_rotations(channel)
+            self._check_cursor_bounds()
+
+    def _cursor_for(self, channel):
+        cursor = self.cursors.get(channel)
+        if cursor is None:
+            # First visit since startup: pick up where the channel was when the app last stopped (or crashed)
+            saved = self.journal.get("cursors", channel) if self.journal else None
+            cursor = self.cursors[channel] = ChannelCursor(saved)
+            compiled = self.channels.get(channel)
+            if not compiled or cursor.block_index >= len(compiled.block): cursor.block_index = cursor.slot_play_count = 0
+        return cursor
+
+    def _check_cursor_bounds(self):
+        compiled = self.channels.get(self.active_channel)
+        new_block = compiled.block if compiled else ()
         if self.block_index >= len(new_block) and len(new_block) > 0:
             self.block_index = 0
             self.slot_play_count = 0
@@ -70,6 +218,7 @@ class ScheduleEngine:
         return {}
 
     def _save_config(self):
+        if self.read_only: return
         try:
             with open(self.config_file, 'w') as f: json.dump(self.config, f, indent=4)
         except Exception as e: print(f"DEBUG: Could not save config: {e}")
@@ -92,68 +241,165 @@ class ScheduleEngine:
         return self.config.get("channels", {}).get(self.active_channel, {})
 
     def _get_local_bookmark(self, show_name):
-        return self._get_channel_data().get("bookmarks", {}).get(show_name, 0)
+        if show_name in self._sim_bookmarks: return self._sim_bookmarks[show_name]
+        index = self.journal.get("bookmarks", self.active_channel, show_name) if self.journal else None
+        if index is None:
+            # Bookmarks from before the journal are still in the config
+            index = self._get_channel_data().get("bookmarks", {}).get(show_name, 0)
+        return index
 
     def _set_local_bookmark(self, show_name, index):
-        self.config["channels"][self.active_channel]["bookmarks"][show_name] = index
-        self._save_config()
+        if self._simulating:
+            self._sim_bookmarks[show_name] = index
+            return
+        self._checkpoint(("bookmarks", self.active_channel, show_name), index)
+
+    def _save_cursor(self):
+        if self._simulating: return
+        self._checkpoint(("cursors", self.active_channel), self.cursor.as_list())
+
+    def _checkpoint(self, key, value):
+        # A read-only journal (the EPG command line tool) or none at all (a fork) just isn't written to
+        if self.journal and not self.journal.read_only: self.journal.set(key, value)
 
     def _flatten_series(self, show_name):
-        if show_name not in self.library: return []
-        series_data = self.library[show_name]
-        flat_eps = []
-        for season in sorted(series_data.keys()): flat_eps.extend(sorted(series_data[season]))
-        blacklist = self.config.get("blacklist", [])
-        return [ep for ep in flat_eps if ep not in blacklist]
-
-    def _resolve_all_rotations(self):
-        for channel in self.config.get("channels", {}).values():
-            for slot in channel.get("schedule_block", []):
-                if slot.get("type") == "rotate":
-                    # Only resolve if it doesn't already have one, to preserve state during hot reload
-                    if "resolved_show" not in slot:
-                        group_name = slot.get("group")
-                        group_shows = self.rotation_groups.get(group_name, [])
-                        if group_shows:
-                            slot["resolved_show"] = random.choice(group_shows)
-
-    def _get_episode(self, show_name, slot_data):
-        flat_eps = self._flatten_series(show_name)
+        return self.episode_index.episodes(show_name)
+
+    def _saved_state(self, *key, default=None):
+        """Checkpointed state from the journal, or from the snapshot a fork took of it."""
+        if self.journal: return self.journal.get(*key, default=default)
+        node = self._detached
+        for part in key:
+            if not isinstance(node, dict) or part not in node: return default
+            node = node[part]
+        return node
+
+    def _resolve_rotations(self, channel_name):
+        """Resolves the rotate slots of one channel (other channels are resolved when they go on air)."""
+        compiled = self.channels.get(channel_name)
+        if not compiled: return
+        cursor = self._cursor_for(channel_name)
+        saved = self._saved_state("rotations", channel_name, default={})
+        for slot in compiled.block:
+            # Only resolve if it doesn't already have one, to preserve state during hot reload
+            if slot.type != SlotType.ROTATE or slot.index in cursor.rotations: continue
+            # The pick from before a restart, if it's still in the group
+            if saved.get(str(slot.index)) in self.rotation_groups.get(slot.group, []): cursor.rotations[slot.index] = saved[str(slot.index)]
+            else: self._resolve_slot(slot, channel_name, cursor)
+
+    def _rotation_queue(self, group):
+        queue = self._sim_queues.get(group) if self._simulating else None
+        if queue is not None: return queue
+        queue = self.rotation_queues.get(group)
+        if queue is None:
+            saved = self._saved_state("rotation_queue", group, default={})
+            queue = self.rotation_queues[group] = RotationQueue(self.rotation_groups.get(group, []), self.rotation_weights.get(group), saved)
+        if self._simulating: queue = self._sim_queues[group] = queue.copy()
+        return queue
+
+    def _resolve_slot(self, slot, channel_name=None, cursor=None):
+        """
+        Gives a rotate slot the group's least recently aired show and checkpoints both the pick and
+        the show's new standing in the group, so a restart carries on with the same rotation.
+        """
+        if not self.rotation_groups.get(slot.group): return
+        show, standing = self._rotation_queue(slot.group).pick()
+        if show is None: return
+        cursor = cursor or self.cursor
+        cursor.rotations[slot.index] = show
+        if not self._simulating:
+            self._checkpoint(("rotations", channel_name or self.active_channel, str(slot.index)), show)
+            self._checkpoint(("rotation_queue", slot.group, show), list(standing))
+
+    def set_rotation_groups(self, groups, weights=None):
+        """Swaps in edited rotation groups (from the rotation editor). Returns the groups that changed."""
+        with self.lock:
+            changed = self._swap_rotation_groups(groups, weights or {})
+            if changed:
+                self._resolve_rotations(self.active_channel)
+                self._version += 1
+            return changed
+
+    def _swap_rotation_groups(self, groups, weights):
+        """
+        Updates the queues of groups whose members or weights changed (shows that stay keep their
+        standing) and drops rotation picks that left their group. Untouched groups cost nothing.
+        """
+        changed = {g for g in groups.keys() | self.rotation_groups.keys() | weights.keys() | self.rotation_weights.keys()
+                   if groups.get(g) != self.rotation_groups.get(g) or weights.get(g) != self.rotation_weights.get(g)}
+        self.rotation_groups, self.rotation_weights = groups, weights
+        if not changed: return changed
+
+        for group in changed:
+            queue = self.rotation_queues.get(group)
+            if queue is None: continue
+            if group in groups: queue.sync(groups[group], weights.get(group))
+            else: del self.rotation_queues[group]
+
+        for name, cursor in self.cursors.items():
+            block = self.channels[name].block if name in self.channels else ()
+            for i, show in list(cursor.rotations.items()):
+                group = block[i].group if i < len(block) else None
+                if group in changed and show not in groups.get(group, []): del cursor.rotations[i]
+        return changed
+
+    def _carry_rotations(self, old_channels, new_channels, changed, inserted=None):
+        """
+        Drops the rotation picks of slots in changed channels that are no longer the same rotate slot.
+        inserted is (channel, index) of a slot that was just put in: picks from there on move up one, with their slots.
+        """
+        for name in changed:
+            cursor = self.cursors.get(name)
+            if cursor is None: continue
+            old, new = old_channels.get(name), new_channels.get(name)
+            shift_from = inserted[1] if inserted and inserted[0] == name else None
+            carried = {}
+            for i, show in cursor.rotations.items():
+                j = i + 1 if shift_from is not None and i >= shift_from else i
+                same = (old and new and i < len(old.block) and j < len(new.block)
+                        and new.block[j].type == SlotType.ROTATE and old.block[i].group == new.block[j].group)
+                if same: carried[j] = show
+            if carried != cursor.rotations:
+                cursor.rotations = carried
+                # The journaled picks are keyed by slot index as well
+                self._checkpoint(("rotations", name), {str(i): show for i, show in carried.items()})
+
+    def _get_episode(self, show_name, slot, pool=None):
+        """Next episode of a show for this slot, or with `pool` the next item of a MediaPool (show_name is then its label)."""
+        show_eps = pool if pool is not None else self.episode_index.get(show_name)
+        flat_eps = show_eps.episodes
         if not flat_eps: return None
 
-        mode = slot_data.get("mode", "sequential").lower()
-
         # 1. OVERRIDE START (BULLETPROOF MATCHING)
-        if "override_start" in slot_data and slot_data["override_start"]:
-            target_ep = os.path.normpath(slot_data["override_start"])
-            del slot_data["override_start"]
+        if slot.override_start and slot not in self.cursor.overrides_done:
+            target_ep = slot.override_start
+            self.cursor.overrides_done.add(slot)
+            # Used up for good, this is a user edit so it goes back to the config
+            if not self._simulating:
+                entries = self._get_channel_data().get("timeslots" if slot.minute is not None else "schedule_block", [])
+                if slot.index < len(entries): entries[slot.index].pop("override_start", None)
             
-            # Check if the requested override matches the end of any file in the library
-            match_path = None
-            for p in flat_eps:
-                if os.path.normpath(p).endswith(target_ep):
-                    match_path = p
-                    break
+            # Resolve a file name, partial path or SxEE token against the show's episodes
+            match_path, problem = self._resolve_override(show_eps, target_ep, show_name)
+            if problem: print(f"DEBUG: {problem}")
                     
             if match_path:
-                self._set_local_bookmark(show_name, flat_eps.index(match_path) + 1)
+                if not self._simulating: self._save_config()
+                self._set_local_bookmark(show_name, show_eps.position[match_path] + 1)
                 return match_path
-            else:
+            elif not self._simulating:
                 self._save_config()
 
         # 2. SEQUENTIAL
-        if "sequential" in mode:
-            if slot_data.get("sync_global", False):
-                last_played_idx = -1
-                history_log = self.history.get("playback_log", {})
-                for i in range(len(flat_eps) - 1, -1, -1):
-                    fname = os.path.basename(flat_eps[i])
-                    if fname in history_log and history_log[fname].get("status") == "watched":
-                        last_played_idx = i
-                        break
-                next_idx = last_played_idx + 1
+        if slot.mode is PlayMode.SEQUENTIAL:
+            if slot.sync_global:
+                last_idx = self._watch_state(show_name, pool).last
+                # A planned airing counts as watched for the rest of the lookahead
+                if self._simulating: last_idx = self._sim_last_watched.get(show_name, last_idx)
+                next_idx = last_idx + 1
                 if next_idx >= len(flat_eps): next_idx = 0 
                 ep_path = flat_eps[next_idx]
+                if self._simulating: self._sim_last_watched[show_name] = next_idx
                 self._set_local_bookmark(show_name, next_idx + 1)
                 return ep_path
             else:
@@ -164,165 +410,453 @@ class ScheduleEngine:
                 return ep_path
 
         # 3. RANDOM NO-RERUNS
-        elif mode == "random_no_reruns":
-            unwatched = []
-            history_log = self.history.get("playback_log", {})
-            for ep in flat_eps:
-                fname = os.path.basename(ep)
-                if fname not in history_log or history_log[fname].get("status") != "watched":
-                    unwatched.append(ep)
-            if not unwatched: unwatched = flat_eps
-            return random.choice(unwatched)
+        elif slot.mode is PlayMode.RANDOM_NO_RERUNS:
+            unwatched = self._watch_state(show_name, pool).unwatched
+            if not unwatched: return self._draw(pool.name if pool is not None else "show:" + show_name, flat_eps)
+            return flat_eps[self.rng.choice(unwatched)]
 
         # 4. RANDOM
         else:
-            return random.choice(flat_eps)
-
-    def _get_movie(self, slot_data):
-        if not self.movie_library: return None
-        target_path = slot_data.get("path")
-        if target_path and target_path in self.movie_library: return target_path
-        return random.choice(self.movie_library)
-        
-    def _get_music_video(self, slot_data):
-        if not self.music_video_library: return None
-        target_path = slot_data.get("path")
-        if target_path and target_path in self.music_video_library: return target_path
-        return random.choice(self.music_video_library)
+            return self._draw(pool.name if pool is not None else "show:" + show_name, flat_eps)
+
+    @staticmethod
+    def _resolve_override(source, target, label):
+        """(path, None) if an override_start names exactly one file of `source`, else (None, what's wrong)."""
+        matches, total = source.suffix.resolve(target)
+        if total == 1: return matches[0], None
+        if total > 1:
+            # With the folder, the candidates often share a file name ("Season 1/Pilot.mkv", "Season 2/Pilot.mkv")
+            shown = ", ".join(os.path.join(os.path.basename(os.path.dirname(m)), os.path.basename(m)) for m in matches)
+            return None, f"override_start '{target}' is ambiguous for {label}: {total} matches ({shown}{', ...' if total > len(matches) else ''})"
+        return None, f"override_start '{target}' matched nothing in {label}"
+
+    def _override_problem(self, slot):
+        """Why an injected slot's override_start wouldn't be used, or None (checked up front, it's dropped silently on air)."""
+        if not slot.override_start: return None
+        if slot.type is SlotType.ANCHOR: sources = [(slot.show, self.episode_index.get(slot.show))]
+        elif slot.type is SlotType.ROTATE: sources = [(show, self.episode_index.get(show)) for show in self.rotation_groups.get(slot.group, [])]
+        elif slot.type is SlotType.MOVIE: sources = [("the movies", self.movie_library)]
+        else: sources = [("the music videos", self.music_video_library)]
+        problems = []
+        for label, source in sources:
+            # A rotate slot's override applies to whichever member it lands on, one of them has to have it
+            path, problem = self._resolve_override(source, slot.override_start, label)
+            if path: return None
+            problems.append(problem)
+        return "; ".join(problems) or f"override_start '{slot.override_start}': group {slot.group!r} has no shows"
+
+    def _watch_state(self, show_name, pool=None):
+        if pool is not None: return pool.watch_state(self.history["playback_log"])
+        return self.episode_index.watch_state(show_name)
+
+    def _get_from_pool(self, pool, label, slot):
+        # A slot pinned to one file plays it while it's in the library (saved as a path or a file name)
+        target_path = pool.resolve(slot.path)
+        if target_path: return target_path
+        return self._get_episode(label, slot, pool)
+
+    def _get_movie(self, slot):
+        return self._get_from_pool(self.movie_library, "Feature Presentation", slot)
+
+    def _get_music_video(self, slot):
+        return self._get_from_pool(self.music_video_library, "Music Video", slot)
+
+    def _bag(self, name, items):
+        bag = self.bags.get(name)
+        if bag is None:
+            # Picks up the round in progress when the app last stopped
+            drawn = self._saved_state("bags", name, default={})
+            bag = self.bags[name] = ShuffleBag(items, drawn)
+        elif bag.source is not items:
+            # The show was re-flattened (library change or blacklist edit)
+            bag.sync(items)
+        return bag
+
+    def _draw(self, name, items):
+        """
+        Next item from the shuffle bag for `items`: no repeats until all of them have aired.
+        Each draw is one journal append ({"bags": {name: {item: 1}}}), a new round clears the bag's key.
+        """
+        if self._simulating:
+            bag = self._sim_bags.get(name)
+            if bag is None: bag = self._sim_bags[name] = self._bag(name, items).copy()
+            elif bag.source is not items: bag.sync(items)
+            return bag.draw(self.rng)[0]
+
+        item, new_round = self._bag(name, items).draw(self.rng)
+        if item is not None:
+            if new_round: self._checkpoint(("bags", name), None)
+            self._checkpoint(("bags", name, item), 1)
+        return item
 
     def get_next_item(self):
-        channel_data = self._get_channel_data()
-        schedule_block = channel_data.get("schedule_block", [])
-        settings = channel_data.get("settings", {})
+        with self.lock:
+            item = self._get_next_item()
+            self._save_cursor()
+            self.cursor.version += 1
+            # The lookahead plans from the end of this item, the station corrects it once the real length is known
+            length = self._planned_length(item)
+            self.cursor.on_air_until = self._now() + length if length else None
+            return item
+
+    def set_on_air_until(self, timestamp):
+        """Tells the lookahead when the item on air really ends (a packed break, a resumed episode)."""
+        with self.lock:
+            self.cursor.on_air_until = timestamp
+            self.cursor.version += 1
+
+    def _get_next_item(self):
+        channel = self.channels.get(self.active_channel)
+        if channel is None:
+            display = "Schedule Has Errors" if self.active_channel in self.config.get("channels", {}) else "No Schedule Block Configured"
+            return {"type": "video", "show": "System", "display": display, "path": None}
+        schedule_block = channel.block
+        settings = channel.settings
+        cursor = self.cursor # Straight to the slots, this runs for every item and every lookahead step
         
+        if settings.timeslot:
+            return self._get_timeslot_item(channel, settings)
+
         if not schedule_block:
             return {"type": "video", "show": "System", "display": "No Schedule Block Configured", "path": None}
 
-        comm_freq = settings.get("commercial_frequency", 3)
-        if self.items_since_break >= comm_freq:
-            self.items_since_break = 0
-            return {"type": "break", "min": settings.get("commercial_min_sec", 60), "max": settings.get("commercial_max_sec", 120)}
+        if cursor.items_since_break >= settings.commercial_frequency:
+            cursor.items_since_break = 0
+            return {"type": "break", "min": settings.commercial_min, "max": settings.commercial_max, "tolerance": settings.commercial_tolerance}
 
         loop_guard = 0
         while loop_guard < len(schedule_block):
-            if self.block_index >= len(schedule_block):
-                self.block_index = 0
-                self.slot_play_count = 0
+            if cursor.block_index >= len(schedule_block):
+                cursor.block_index = 0
+                cursor.slot_play_count = 0
                 
-            slot = schedule_block[self.block_index]
-            target_count = slot.get("count", 1)
-            
-            s_type = slot.get("type")
+            slot = schedule_block[cursor.block_index]
+            s_type = slot.type
             ep_path = None
             show_name = "Unknown"
 
-            if s_type == "anchor":
-                show_name = slot.get("show")
+            if s_type is SlotType.ANCHOR:
+                show_name = slot.show
                 ep_path = self._get_episode(show_name, slot)
                 
-            elif s_type == "rotate":
-                group_name = slot.get("group")
-                show_name = slot.get("resolved_show")
-                if not show_name:
-                    group_shows = self.rotation_groups.get(group_name, [])
-                    show_name = random.choice(group_shows) if group_shows else "Unknown"
+            elif s_type is SlotType.ROTATE:
+                # Only unresolved on a channel being previewed, or a group that was empty until now
+                if slot.index not in cursor.rotations: self._resolve_slot(slot)
+                show_name = cursor.rotations.get(slot.index, "Unknown")
                 ep_path = self._get_episode(show_name, slot)
 
-            elif s_type == "movie":
+            elif s_type is SlotType.MOVIE:
                 show_name = "Feature Presentation"
                 ep_path = self._get_movie(slot)
                 
-            elif s_type == "music_video":
+            elif s_type is SlotType.MUSIC_VIDEO:
                 show_name = "Music Video"
                 ep_path = self._get_music_video(slot)
 
             if ep_path:
-                self.items_since_break += 1
+                cursor.items_since_break += 1
                 
-                self.slot_play_count += 1
-                if self.slot_play_count >= target_count:
-                    self.slot_play_count = 0
-                    self.block_index += 1
-                    
-                    if s_type == "rotate":
-                        group_shows = self.rotation_groups.get(slot.get("group"), [])
-                        if group_shows:
-                            slot["resolved_show"] = random.choice(group_shows)
+                cursor.slot_play_count += 1
+                if cursor.slot_play_count >= slot.count:
+                    cursor.slot_play_count = 0
+                    if s_type is SlotType.ROTATE: self._resolve_slot(slot)
+                    cursor.block_index += 1
 
                 return {"type": "video", "show": show_name, "display": os.path.basename(ep_path), "path": ep_path}
                 
-            self.slot_play_count = 0
-            self.block_index += 1
+            cursor.slot_play_count = 0
+            cursor.block_index += 1
             loop_guard += 1
 
         return {"type": "video", "show": "System", "display": "No Valid Media Found in Block", "path": None}
 
-    def get_upcoming_list(self, limit=10):
-        upcoming = []
-        sim_block_idx = self.block_index
-        sim_slot_count = self.slot_play_count
-        sim_items_since = self.items_since_break
-        
-        channel_data = self._get_channel_data()
-        schedule_block = channel_data.get("schedule_block", [])
-        settings = channel_data.get("settings", {})
-        comm_freq = settings.get("commercial_frequency", 3)
-
-        if not schedule_block: return upcoming
+    # --- TIME-SLOT CHANNELS ---
+    # A channel with settings "mode": "timeslot" airs its "timeslots" list at fixed times every day:
+    #   "timeslots": [{"time": "20:00", "show": "The Simpsons", "mode": "sequential"}, ...]
+    # The time between the end of one show and the next anchor is filled with music videos and
+    # commercials. An anchor that can't start on time still airs up to "timeslot_grace_sec" late. Each call re-plans from the clock, so a skip just shifts the filler.
+    # Injected slots are refused, see inject_slot.
+    FILLER_MIN_BREAK = 30 # Never end on a gap the commercial packer can't fill
+
+    def _now(self):
+        return self._sim_now if self._sim_now is not None else time.time()
+
+    def _anchors_around(self, timeslots, now):
+        """Returns ((start_ts, key, slot) of the latest anchor at or before now, the same for the next one)."""
+        if not timeslots: return None, None
+        today = datetime.datetime.fromtimestamp(now).replace(hour=0, minute=0, second=0, microsecond=0)
+
+        current = following = None
+        # Yesterday's last slot may still be running just after midnight (timeslots are sorted at compile time)
+        for day in (-1, 0, 1):
+            base = today + datetime.timedelta(days=day)
+            for slot in timeslots:
+                start = base + datetime.timedelta(minutes=slot.minute)
+                ts = start.timestamp()
+                entry = (ts, start.strftime("%Y-%m-%d %H:%M"), slot)
+                if ts <= now: current = entry
+                elif following is None: following = entry
+        return current, following
+
+    def _get_timeslot_item(self, channel, settings):
+        now = self._now()
+        current, following = self._anchors_around(channel.timeslots, now)
+        if following is None:
+            return {"type": "video", "show": "System", "display": "No Time Slots Configured", "path": None}
+
+        # 1. The anchor whose slot we're in hasn't aired yet. It may start late (after an overrun
+        #    or a skip onto a long item), but not so late that it's mostly missed (e.g. after a restart)
+        if current and current[1] != self.last_anchor and now - current[0] <= settings.timeslot_grace:
+            slot = current[2]
+            show_name = slot.show
+            ep_path = self._get_episode(show_name, slot)
+            self.last_anchor = current[1]
+            if ep_path:
+                return {"type": "video", "show": show_name, "display": os.path.basename(ep_path), "path": ep_path, "anchor": current[1]}
 
-        for _ in range(limit):
-            if sim_items_since >= comm_freq:
-                upcoming.append({"type": "break", "min": settings.get("commercial_min_sec", 60), "max": settings.get("commercial_max_sec", 120)})
-                sim_items_since = 0
-                continue
-                
-            if sim_block_idx >= len(schedule_block):
-                sim_block_idx = 0
-                sim_slot_count = 0
-                
-            slot = schedule_block[sim_block_idx]
-            target_count = slot.get("count", 1)
-            s_type = slot.get("type")
-            
-            if s_type == "rotate": name = slot.get("resolved_show", slot.get("group"))
-            elif s_type == "movie": name = "Feature Presentation" if not slot.get("path") else os.path.basename(slot.get("path"))
-            elif s_type == "music_video": name = "Music Video" if not slot.get("path") else os.path.basename(slot.get("path"))
-            else: name = slot.get("show", "Unknown")
-                
-            upcoming.append({"type": "video", "show": name, "display": f"[{slot.get('mode', 'sequential').upper()}]"})
-            
-            sim_slot_count += 1
-            if sim_slot_count >= target_count:
-                sim_slot_count = 0
-                sim_block_idx += 1
-                
-            sim_items_since += 1
+        # 2. Too close to the next anchor to fill, start it a few seconds early
+        if following[0] - now < self.FILLER_MIN_BREAK:
+            slot = following[2]
+            ep_path = self._get_episode(slot.show, slot)
+            self.last_anchor = following[1]
+            if ep_path:
+                return {"type": "video", "show": slot.show, "display": os.path.basename(ep_path), "path": ep_path, "anchor": following[1]}
+
+        # 3. Fill up to the next anchor
+        return self._get_filler(following[0] - now, settings)
+
+    def _build_filler_pool(self):
+        # Built against one probe cache version, so it's redone once the background prefetch (or any
+        # probe) has found real durations instead of planning every video at the fallback for good
+        version = self.probe.version if self.probe else 0
+        durations = self.probe.duration_table(self.music_video_library) if self.probe else {}
+        fallback = self.FALLBACK_DURATIONS["music_video"]
+        pool = sorted((durations.get(mv, fallback), mv) for mv in self.music_video_library)
+        self._filler_pool = (version, [d for d, _ in pool], [mv for _, mv in pool])
+        return self._filler_pool
+
+    def _get_filler(self, gap, settings):
+        """
+        Next filler item for a gap of `gap` seconds: a random music video that still leaves room for a
+        closing break, else one commercial break sized to the rest of the gap (O(log n) per call).
+        """
+        max_break = settings.commercial_max
+        pool = self._filler_pool
+        if pool is None or (self.probe and pool[0] != self.probe.version): pool = self._build_filler_pool()
+        _, durations, videos = pool
+
+        if gap > max_break and videos:
+            # Any video that leaves either nothing or at least a fillable break behind
+            fits = bisect.bisect_right(durations, gap - self.FILLER_MIN_BREAK)
+            if fits:
+                mv = videos[self.rng.randrange(fits)]
+                return {"type": "video", "show": "Music Video", "display": os.path.basename(mv), "path": mv}
+
+        # Close the gap with commercials (no bumper, the next anchor is right behind it). A gap up to
+        # FILLER_MIN_BREAK over the channel's max is one break, so it never ends on one too short to pack;
+        # a longer one (no music video fits) gets a max-length break now and the rest on the next call.
+        length = max(1, int(gap))
+        if gap > max_break + self.FILLER_MIN_BREAK: length = int(min(max_break, gap - self.FILLER_MIN_BREAK))
+        return {"type": "break", "min": length, "max": length, "tolerance": settings.commercial_tolerance, "bumper": False}
+
+    def get_upcoming_list(self, limit=10, channel=None):
+        """
+        The next `limit` items exactly as get_next_item will return them (episodes, breaks, durations).
+        Pass a channel name to preview a channel that isn't on air.
+        """
+        with self.lock:
+            if channel and channel != self.active_channel:
+                on_air = (self.active_channel, self.cursor)
+                self.active_channel, self.cursor = channel, self._cursor_for(channel)
+                try:
+                    return self.get_upcoming_list(limit)
+                finally:
+                    self.active_channel, self.cursor = on_air
+
+            cursor = self.cursor
+            cached = cursor.plan_cache
+            if cached and cached[0] == self._version and cached[1] == cursor.version and cached[2] >= limit:
+                return cached[3][:limit]
+            horizon = max(limit, 10)
+            plan = self._get_upcoming_list(horizon)
+            cursor.plan_cache = (self._version, cursor.version, horizon, plan)
+            return plan[:limit]
+
+    @contextmanager
+    def _simulation(self):
+        """
+        Runs _get_next_item against a throwaway copy of the playback state: the cursor (trackers,
+        rotation picks, used overrides), bookmarks and the RNG are all restored afterwards, and nothing
+        is written to disk. Because the RNG state is restored, the real picks afterwards come out the
+        same as the simulated ones.
+        """
+        saved_cursor = self.cursor
+        saved_rng = self.rng.getstate()
+        saved_sim = (self._simulating, self._sim_bookmarks, self._sim_last_watched, self._sim_bags, self._sim_queues, self._sim_now)
+        self.cursor = saved_cursor.copy()
+        self._simulating = True
+        self._sim_bookmarks = dict(self._sim_bookmarks)
+        self._sim_last_watched = dict(self._sim_last_watched)
+        # Bags and queues are copied when first drawn from (only the ones a nested simulation already holds here)
+        self._sim_bags = {name: bag.copy() for name, bag in self._sim_bags.items()}
+        self._sim_queues = {group: queue.copy() for group, queue in self._sim_queues.items()}
+        try:
+            yield
+        finally:
+            self._simulating, self._sim_bookmarks, self._sim_last_watched, self._sim_bags, self._sim_queues, self._sim_now = saved_sim
+            self.cursor = saved_cursor
+            self.rng.setstate(saved_rng)
 
+    def _get_upcoming_list(self, limit):
+        upcoming = []
+        offset = 0
+        # Time-slot channels plan against the clock, which starts when the item on air ends
+        start = self._now()
+        if self.cursor.on_air_until and self.cursor.on_air_until > start: start = self.cursor.on_air_until
+        with self._simulation():
+            for _ in range(limit):
+                self._sim_now = start + offset
+                item = self._get_next_item()
+                duration = self._planned_length(item)
+                if duration is None: break
+                upcoming.append(dict(item, duration=duration, start=offset))
+                offset += duration
         return upcoming
 
+    @staticmethod
+    def item_kind(item):
+        if item.get('show') == "Feature Presentation": return "movie"
+        if item.get('show') == "Music Video": return "music_video"
+        return "video"
+
+    def _planned_length(self, item):
+        """Seconds the lookahead plans for an item, None for one that doesn't air (nothing to play)."""
+        # The break's length is drawn when it airs, plan on the middle of its range
+        if item['type'] == 'break': return (item['min'] + item['max']) / 2
+        if not item.get('path'): return None
+        fallback = self.FALLBACK_DURATIONS[self.item_kind(item)]
+        # Cache only, the lookahead never opens media files
+        return self.probe.cached_duration(item['path'], fallback) if self.probe else fallback
+
+    def fork(self, active_channel=None):
+        """
+        Detached copy of the scheduler for long simulations (the EPG), optionally on another channel.
+        The library and the compiled channels are shared read-only, everything else is copied, and the
+        copy never writes to disk.
+        """
+        with self.lock:
+            twin = copy.copy(self)
+            twin.config = copy.deepcopy(self.config)
+            twin.history = {"playback_log": dict(self.history.get("playback_log", {}))}
+            twin.rng = random.Random()
+            twin.rng.setstate(self.rng.getstate())
+            bookmarks = self.journal.get("bookmarks", default={}) if self.journal else {}
+            bookmarks = copy.deepcopy(bookmarks)
+            twin.bags = {name: bag.copy() for name, bag in self.bags.items()}
+            twin.rotation_queues = {group: queue.copy() for group, queue in self.rotation_queues.items()}
+            # Checkpointed bag and queue state for the ones not built yet, the twin can't read the journal
+            twin._detached = {key: copy.deepcopy(self._saved_state(key, default={})) for key in ("bags", "rotation_queue", "rotations")}
+            twin.cursors = {name: cursor.copy() for name, cursor in self.cursors.items()}
+            if active_channel: twin.active_channel = active_channel
+            # Channels that haven't been on air this session come from the journal
+            twin.cursor = twin._cursor_for(twin.active_channel)
+
+        twin.lock = threading.RLock()
+        twin.rotation_groups = twin.config.get("rotation_groups", {})
+        twin.rotation_weights = twin.config.get("rotation_weights", {})
+        twin.episode_index = EpisodeIndex(self.library, twin.config.get("blacklist", []), twin.history["playback_log"])
+        twin.movie_library = self.movie_library.copy()
+        twin.music_video_library = self.music_video_library.copy()
+        twin._simulating = True
+        twin._sim_last_watched = {}
+        twin._sim_bags = {}
+        twin._sim_queues = {}
+        twin.journal = None
+        twin._resolve_rotations(twin.active_channel)
+
+        # Bookmarks from before the journal, overlaid with the journal's
+        twin._sim_bookmarks = dict(twin._get_channel_data().get("bookmarks", {}))
+        twin._sim_bookmarks.update(bookmarks.get(twin.active_channel, {}))
+        return twin
+
     def get_upcoming_durations(self, limit=3):
+        """[(show, seconds)] for the next `limit` shows, with any breaks between them folded into the time."""
         upcoming = []
-        future_items = [i for i in self.get_upcoming_list(limit=limit+1) if i['type'] != 'break'][:limit]
-        
-        for item in future_items:
-            if item.get("show") == "Feature Presentation": dur = 5400
-            elif item.get("show") == "Music Video": dur = 240
-            else: dur = 1320
-            upcoming.append((item.get("show", "Unknown"), dur))
-            
+        for item in self.get_upcoming_list(limit=limit * 2 + 2):
+            if item['type'] == 'break':
+                if upcoming: upcoming[-1] = (upcoming[-1][0], upcoming[-1][1] + item['duration'])
+                continue
+            if len(upcoming) == limit: break
+            upcoming.append((item.get("show", "Unknown"), item['duration']))
         return upcoming
 
+    def apply_library_update(self, update):
+        """
+        Patches the library containers in place with a change set from the LibraryWatcher.
+        The same dict/list objects are shared with the station, so nothing gets rebuilt and
+        the playback trackers (block_index, bookmarks, etc.) are left alone.
+        Returns the list of shows that were added, changed or removed.
+        """
+        changed_shows = []
+        with self.lock:
+            if "tv" in update:
+                new_tv = update["tv"]
+                for show in list(self.library.keys()):
+                    if show not in new_tv:
+                        del self.library[show]
+                        changed_shows.append(show)
+                for show, seasons in new_tv.items():
+                    if self.library.get(show) != seasons:
+                        self.library[show] = seasons
+                        changed_shows.append(show)
+                self.episode_index.invalidate(changed_shows)
+
+            # The pools are shared with the station, their bags notice the new path list on the next draw
+            if "movies" in update: self.movie_library.replace(update["movies"])
+            if "music_videos" in update:
+                self.music_video_library.replace(update["music_videos"])
+                self._filler_pool = None
+            self._version += 1
+        return changed_shows
+
+    def record_play(self, path, entry):
+        """Called after a playback is written to the history file. Updates the in-memory log and watch index."""
+        with self.lock:
+            self.history["playback_log"][os.path.basename(path)] = entry
+            self.record_watch(path, entry.get("status"))
+            self._version += 1
+
+    def record_watch(self, path, status):
+        """Updates whichever watch index (a show's, or a media pool's) holds this file."""
+        self.episode_index.record_play(path, status)
+        self.movie_library.record_play(path, status)
+        self.music_video_library.record_play(path, status)
+
     def inject_slot(self, slot_data, insert_next=True):
-        """Called by the IPC server to inject a Discord suggestion into the live schedule."""
-        channel_data = self.config.get("channels", {}).get(self.active_channel, {})
-        block = channel_data.get("schedule_block", [])
-        
-        if insert_next:
-            # Insert immediately after the currently playing slot
-            block.insert(self.block_index, slot_data)
-        else:
-            # Add to the very end of the block
-            block.append(slot_data)
-            
-        self._save_config()
-        self.hot_reload()
\ No newline at end of file
+        """
+        Called by the IPC server to inject a Discord suggestion into the live schedule.
+        Raises ScheduleConfigError if the channel can't be aired with the slot in it, and leaves
+        the config (in memory and on disk) as it was.
+        """
+        with self.lock:
+            channel_data = self.config.get("channels", {}).get(self.active_channel)
+            if channel_data is None: raise ScheduleConfigError([f"{self.active_channel}: channel isn't in the config"])
+            # Time-slot channels air their timeslots list against the clock, there's no block to put a slot in
+            if channel_data.get("settings", {}).get("mode") == "timeslot":
+                raise ScheduleConfigError([f"{self.active_channel}: time-slot channels don't take injected slots"])
+            block = channel_data.setdefault("schedule_block", [])
+            # Immediately after the currently playing slot, or at the very end of the block
+            index = self.block_index if insert_next else len(block)
+
+            # The whole channel has to compile with the slot in it before anything is touched
+            compiled = compile_channel(self.active_channel, dict(channel_data, schedule_block=block[:index] + [slot_data] + block[index:]))
+            problem = self._override_problem(compiled.block[index])
+            if problem: raise ScheduleConfigError([f"injected slot: {problem}"])
+            block.insert(index, slot_data)
+            self._save_config()
+            try: self.hot_reload(inserted=(self.active_channel, index))
+            except ScheduleConfigError:
+                # Caught by the check above in practice, but a rejected inject must never stay in the config
+                del block[index]
+                self._save_config()
+                raise
\ No newline at end of file
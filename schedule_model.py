@@ -0,0 +1,179 @@
+import copy
+from enum import Enum
+
+
+class ScheduleConfigError(ValueError):
+    """A channel's schedule in station_config.json can't be used. Carries every problem found."""
+    def __init__(self, errors):
+        self.errors = list(errors)
+        super().__init__("; ".join(self.errors))
+
+
+class SlotType(Enum):
+    ANCHOR = "anchor"
+    ROTATE = "rotate"
+    MOVIE = "movie"
+    MUSIC_VIDEO = "music_video"
+
+
+class PlayMode(Enum):
+    SEQUENTIAL = "sequential"
+    RANDOM_NO_RERUNS = "random_no_reruns"
+    RANDOM = "random"
+
+    @classmethod
+    def parse(cls, value):
+        # Same leniency the scheduler always had: any "...sequential..." spelling is sequential,
+        # anything unrecognised plays at random
+        value = (value or "sequential").lower()
+        if "sequential" in value: return cls.SEQUENTIAL
+        if value == "random_no_reruns": return cls.RANDOM_NO_RERUNS
+        return cls.RANDOM
+
+
+class Slot:
+    """
+    One compiled schedule_block (or timeslots) entry. Read-only after compile: picks that change
+    while the channel plays (rotation choices, consumed overrides) live on the ChannelCursor.
+    index is the entry's position in the config list it came from.
+    """
+    __slots__ = ("index", "type", "show", "group", "count", "mode", "sync_global", "override_start", "path", "minute")
+
+    def __init__(self, index, slot_type, show=None, group=None, count=1, mode=PlayMode.SEQUENTIAL,
+                 sync_global=False, override_start=None, path=None, minute=None):
+        self.index = index
+        self.type = slot_type
+        self.show = show
+        self.group = group
+        self.count = count
+        self.mode = mode
+        self.sync_global = sync_global
+        self.override_start = override_start
+        self.path = path
+        self.minute = minute # Time-slot entries only: minutes after midnight
+
+    def __repr__(self):
+        return f"Slot({self.index}, {self.type.value}, {self.show or self.group or self.path or ''!r})"
+
+
+class ChannelSettings:
+    __slots__ = ("timeslot", "commercial_frequency", "commercial_min", "commercial_max", "commercial_tolerance", "timeslot_grace")
+
+    def __init__(self, settings):
+        self.timeslot = settings.get("mode") == "timeslot"
+        self.commercial_frequency = settings.get("commercial_frequency", 3)
+        self.commercial_min = settings.get("commercial_min_sec", 60)
+        self.commercial_max = settings.get("commercial_max_sec", 120)
+        self.commercial_tolerance = settings.get("commercial_tolerance_sec", 3)
+        self.timeslot_grace = settings.get("timeslot_grace_sec", 900)
+
+
+class CompiledChannel:
+    """A channel's settings, schedule block and time slots, validated and ready for the scheduler."""
+    __slots__ = ("name", "settings", "block", "timeslots", "source")
+
+    def __init__(self, name, settings, block, timeslots, source=None):
+        self.name = name
+        self.settings = settings
+        self.block = block # tuple of Slot, in airing order
+        self.timeslots = timeslots # tuple of Slot, sorted by minute
+        self.source = source # Snapshot of the config dict it was compiled from, to tell when it changed
+
+
+def _number(value, what, errors, minimum=0, whole=False):
+    kinds = int if whole else (int, float)
+    if isinstance(value, bool) or not isinstance(value, kinds) or value < minimum:
+        errors.append(f"{what} must be a {'whole number' if whole else 'number'} >= {minimum}, got {value!r}")
+        return False
+    return True
+
+
+def compile_slot(data, index, where="slot"):
+    """Builds a Slot from one schedule_block dict. Raises ScheduleConfigError if it can't be aired."""
+    errors = []
+    if not isinstance(data, dict): raise ScheduleConfigError([f"{where}: expected an object, got {data!r}"])
+
+    try: slot_type = SlotType(data.get("type"))
+    except ValueError:
+        raise ScheduleConfigError([f"{where}: unknown slot type {data.get('type')!r}"])
+
+    count = data.get("count", 1)
+    if not isinstance(count, int) or isinstance(count, bool) or count < 1:
+        errors.append(f"{where}: count must be a whole number >= 1, got {count!r}")
+    if slot_type == SlotType.ANCHOR and not data.get("show"): errors.append(f"{where}: anchor slot has no show")
+    if slot_type == SlotType.ROTATE and not data.get("group"): errors.append(f"{where}: rotate slot has no group")
+    if errors: raise ScheduleConfigError(errors)
+
+    # Movie and music video slots ignored the mode before they supported one, and always played at random
+    mode = data.get("mode") or ("random" if slot_type in (SlotType.MOVIE, SlotType.MUSIC_VIDEO) else None)
+    return Slot(index, slot_type, show=data.get("show"), group=data.get("group"), count=count,
+                mode=PlayMode.parse(mode), sync_global=bool(data.get("sync_global", False)),
+                override_start=data.get("override_start") or None, path=data.get("path") or None)
+
+
+def compile_timeslot(data, index, where="timeslot"):
+    if not isinstance(data, dict): raise ScheduleConfigError([f"{where}: expected an object, got {data!r}"])
+    errors = []
+    try:
+        hour, minute = (int(x) for x in str(data.get("time", "")).split(":"))
+        if not (0 <= hour < 24 and 0 <= minute < 60): raise ValueError
+    except ValueError:
+        errors.append(f"{where}: time must be HH:MM, got {data.get('time')!r}")
+    if not data.get("show"): errors.append(f"{where}: no show")
+    if errors: raise ScheduleConfigError(errors)
+
+    return Slot(index, SlotType.ANCHOR, show=data["show"], mode=PlayMode.parse(data.get("mode")),
+                sync_global=bool(data.get("sync_global", False)), override_start=data.get("override_start") or None,
+                minute=hour * 60 + minute)
+
+
+def compile_channel(name, data):
+    """Compiles one channel dict. Raises ScheduleConfigError listing everything wrong with it."""
+    errors = []
+    settings = data.get("settings", {})
+    # The break packer works in whole seconds (randint, bitsets), a fractional length would crash it mid-schedule
+    for key in ("commercial_frequency", "commercial_min_sec", "commercial_max_sec", "commercial_tolerance_sec"):
+        if key in settings: _number(settings[key], f"{name}: {key}", errors, whole=True)
+    if "timeslot_grace_sec" in settings: _number(settings["timeslot_grace_sec"], f"{name}: timeslot_grace_sec", errors)
+    if not errors and settings.get("commercial_min_sec", 60) > settings.get("commercial_max_sec", 120):
+        errors.append(f"{name}: commercial_min_sec is larger than commercial_max_sec")
+
+    def each(entries, build, label):
+        compiled = []
+        for i, entry in enumerate(entries):
+            try: compiled.append(build(entry, i, f"{name}: {label} {i + 1}"))
+            except ScheduleConfigError as e: errors.extend(e.errors)
+        return compiled
+
+    block = each(data.get("schedule_block", []), compile_slot, "slot")
+    timeslots = each(data.get("timeslots", []), compile_timeslot, "timeslot")
+    if errors: raise ScheduleConfigError(errors)
+
+    timeslots.sort(key=lambda slot: slot.minute)
+    # Bookmarks are playback state, not schedule, they don't count as a change
+    source = copy.deepcopy({key: value for key, value in data.items() if key != "bookmarks"})
+    return CompiledChannel(name, ChannelSettings(settings), tuple(block), tuple(timeslots), source)
+
+
+def _unchanged(compiled, data):
+    source = compiled.source
+    if len(source) != len(data) - ("bookmarks" in data): return False
+    return all(key in data and data[key] == value for key, value in source.items())
+
+
+def compile_schedule(config, previous=None):
+    """
+    Returns ({ channel name: CompiledChannel }, [errors]). Channels with errors are left out.
+    A channel whose config is the same as in `previous` (an earlier result) is reused as is,
+    so callers can tell which channels changed by identity.
+    """
+    previous = previous or {}
+    channels, errors = {}, []
+    for name, data in config.get("channels", {}).items():
+        old = previous.get(name)
+        if old is not None and _unchanged(old, data):
+            channels[name] = old
+            continue
+        try: channels[name] = compile_channel(name, data)
+        except ScheduleConfigError as e: errors.extend(e.errors)
+    return channels, errors
@@ -0,0 +1,83 @@
+class ShuffleBag:
+    """
+    Random draws without repeats: every item comes out once, in random order, before any comes out again.
+
+    The pool is one list split in two: pool[:left] haven't been drawn this round, pool[left:] have.
+    A draw swaps a random undrawn item to the boundary and moves the boundary down, and a new round
+    just moves it back to the end, so both are O(1). Items can be added and removed between draws
+    (library changes) without reshuffling; a new item joins the undrawn side.
+    """
+    __slots__ = ("pool", "pos", "left", "last", "source")
+
+    def __init__(self, items=(), drawn=()):
+        drawn = set(drawn)
+        # Already drawn this round (restored from the journal) go to the back
+        self.pool = [item for item in items if item not in drawn]
+        self.left = len(self.pool)
+        self.pool.extend(item for item in items if item in drawn)
+        self.pos = {item: i for i, item in enumerate(self.pool)}
+        self.last = None
+        self.source = items # The list this bag was filled from, to notice when it's been replaced
+
+    def __len__(self):
+        return len(self.pool)
+
+    def _swap(self, i, j):
+        pool = self.pool
+        pool[i], pool[j] = pool[j], pool[i]
+        if self.pos is not None:
+            self.pos[pool[i]] = i
+            self.pos[pool[j]] = j
+
+    def _positions(self):
+        # Copies leave the position map out (they're mostly drawn from and thrown away), build it on demand
+        if self.pos is None: self.pos = {item: i for i, item in enumerate(self.pool)}
+        return self.pos
+
+    def draw(self, rng):
+        """Returns (item, started_new_round). item is None if the bag is empty."""
+        if not self.pool: return None, False
+        new_round = self.left == 0
+        if new_round: self.left = len(self.pool)
+        j = rng.randrange(self.left)
+        # Don't open a round with the item that closed the previous one
+        if new_round and self.left > 1 and self.pool[j] == self.last: j = (j + 1) % self.left
+        self.left -= 1
+        self._swap(j, self.left)
+        self.last = self.pool[self.left]
+        return self.last, new_round
+
+    def add(self, item):
+        if item in self._positions(): return
+        self.pos[item] = len(self.pool)
+        self.pool.append(item)
+        # Into the undrawn part, it hasn't had its turn yet
+        self._swap(self.left, len(self.pool) - 1)
+        self.left += 1
+
+    def discard(self, item):
+        i = self._positions().get(item)
+        if i is None: return
+        if i < self.left:
+            self.left -= 1
+            self._swap(i, self.left)
+            i = self.left
+        self._swap(i, len(self.pool) - 1)
+        self.pool.pop()
+        del self.pos[item]
+
+    def sync(self, items):
+        """Brings the bag in line with a new item list, keeping where the current round is."""
+        new_items = set(items)
+        for item in [item for item in self.pool if item not in new_items]: self.discard(item)
+        for item in items: self.add(item)
+        self.source = items
+
+    def copy(self):
+        twin = ShuffleBag.__new__(ShuffleBag)
+        twin.pool = list(self.pool)
+        twin.pos = None
+        twin.left = self.left
+        twin.last = self.last
+        twin.source = self.source
+        return twin
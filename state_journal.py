@@ -0,0 +1,115 @@
+import os
+import json
+import threading
+
+STATE_JOURNAL_FILE = "station_state.journal"
+
+class StateJournal:
+    """
+    Small append-only store for playback state that changes every episode (bookmarks, cursors).
+
+    Each set() appends one JSON line { "k": [key, path], "v": value } and hands it to the OS right away,
+    so a crash of the app loses nothing. fsync is batched to at most once per flush_interval seconds.
+    When the file grows past compact_every records it's rewritten as a single snapshot line.
+    Loading replays the snapshot and then every record after it; a torn last line is ignored.
+    """
+    def __init__(self, path=STATE_JOURNAL_FILE, flush_interval=2.0, compact_every=1000, read_only=False):
+        self.path = path
+        self.read_only = read_only
+        self.flush_interval = flush_interval
+        self.compact_every = compact_every
+        self.state = {}
+        self._records = 0
+        self._lock = threading.Lock()
+        self._timer = None
+        self._load()
+        self._file = None
+        if read_only: return
+        self._file = open(self.path, 'a', encoding='utf-8')
+        if self._records > self.compact_every: self.compact()
+
+    def _load(self):
+        if not os.path.exists(self.path): return
+        good_end = 0
+        with open(self.path, 'rb') as f:
+            for line in f:
+                try:
+                    if not line.endswith(b"\n"): raise ValueError("unterminated record")
+                    record = json.loads(line.decode('utf-8'))
+                except ValueError:
+                    # Half-written line from a crash, everything before it is intact. Cut it off
+                    # so new records don't get appended behind it.
+                    print("DEBUG: Dropping torn record at the end of the state journal")
+                    break
+                if "snapshot" in record: self.state = record["snapshot"]
+                else: self._apply(record["k"], record["v"])
+                self._records += 1
+                good_end += len(line)
+        if good_end < os.path.getsize(self.path) and not self.read_only:
+            with open(self.path, 'r+b') as f: f.truncate(good_end)
+
+    def _apply(self, key, value):
+        node = self.state
+        for part in key[:-1]: node = node.setdefault(part, {})
+        if value is None: node.pop(key[-1], None)
+        else: node[key[-1]] = value
+
+    def get(self, *key, default=None):
+        node = self.state
+        for part in key:
+            if not isinstance(node, dict) or part not in node: return default
+            node = node[part]
+        return node
+
+    def set(self, key, value):
+        """Records state[key[0]][key[1]]... = value (None deletes it)."""
+        if self.read_only: raise IOError("State journal was opened read-only")
+        key = list(key)
+        with self._lock:
+            if self.get(*key) == value: return
+            self._apply(key, value)
+            self._file.write(json.dumps({"k": key, "v": value}) + "\n")
+            self._file.flush()
+            self._records += 1
+            if self._records > self.compact_every:
+                self._compact_locked()
+            elif self._timer is None:
+                self._timer = threading.Timer(self.flush_interval, self.sync)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def sync(self):
+        """fsyncs everything appended so far."""
+        with self._lock:
+            self._timer = None
+            if not self._file or self._file.closed: return
+            try: os.fsync(self._file.fileno())
+            except OSError as e: print(f"DEBUG: State journal fsync failed: {e}")
+
+    def compact(self):
+        if self.read_only: return
+        with self._lock:
+            self._compact_locked()
+
+    def _compact_locked(self):
+        tmp_path = self.path + ".tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(json.dumps({"snapshot": self.state}) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self._file.close()
+            os.replace(tmp_path, self.path)
+            self._records = 1
+        except Exception as e:
+            print(f"DEBUG: Could not compact state journal: {e}")
+        finally:
+            if self._file.closed: self._file = open(self.path, 'a', encoding='utf-8')
+
+    def close(self):
+        if self.read_only: return
+        with self._lock:
+            if self._timer: self._timer.cancel()
+            self._timer = None
+            self._compact_locked()
+            self._file.close()
@@ -12,6 +12,7 @@ import logging
 from flask import Flask, jsonify, request
 import time
 import datetime
+from concurrent.futures import ThreadPoolExecutor
 
 # Check if we are running as a bundled exe or a script
 if getattr(sys, 'frozen', False):
@@ -26,13 +27,27 @@ if os.name == 'nt' and hasattr(os, 'add_dll_directory'):
 import mpv
 
 from inventory_manager import InventoryManager
+from media_pool import MediaPool
 from schedule_engine import ScheduleEngine
-from commercial_manager import CommercialManager
+from schedule_model import ScheduleConfigError
+from commercial_manager import CommercialManager, BreakPlan
+from state_journal import StateJournal
+from epg_generator import EPGGenerator
+from library_watcher import LibraryWatcher
+from media_probe import MediaProbe
 
 CONFIG_FILE = "station_config.json"
 HISTORY_FILE = "station_history.json"
+INVENTORY_CACHE = "inventory_cache.json"
+INVENTORY_DB = "inventory.db"
+CHECKPOINT_INTERVAL = 5 # Seconds between playback position checkpoints
+RESUME_WINDOW = 15 * 60 # How stale a checkpoint of unknown length can be and still resume
+BUMPER_DURATION = 29 # "We'll be right back" bumper before a break's ads
 DEFAULT_CONFIG = {
     "paths": {"tv": "", "movies": "", "commercials": "", "music_videos": ""},
+    "scan_workers": 8,
+    "watch_interval_sec": 30,
+    "commercial_rules": {"min_separation_sec": 1800, "max_plays_per_window": 2, "window_sec": 3600},
     "blacklist": [],
     "active_channel": "Default Channel",
     "channels": {
@@ -73,16 +88,14 @@ class SlotEditorDialog(tk.Toplevel):
         tk.Label(frame, text="Playback Mode:", font=("Arial", 10, "bold")).grid(row=1, column=0, sticky=tk.W, pady=5)
         self.var_mode = tk.StringVar(value=c_mode)
         
-        # Only TV Shows support complex modes. Movies/Music Videos default to Random
+        modes = ["sequential", "random", "random_no_reruns"]
+        ttk.Combobox(frame, textvariable=self.var_mode, values=modes, state="readonly", width=20).grid(row=1, column=1, sticky=tk.W)
+
+        # Movies/Music Videos play from their whole library, sync and override are TV Show settings
         if s_type in ["movie", "music_video"]:
-            tk.Label(frame, text="Random").grid(row=1, column=1, sticky=tk.W)
-            self.var_mode.set("random")
             self.var_sync = tk.BooleanVar(value=False)
             self.var_override = tk.StringVar(value="")
         else:
-            modes = ["sequential", "random", "random_no_reruns"]
-            ttk.Combobox(frame, textvariable=self.var_mode, values=modes, state="readonly", width=20).grid(row=1, column=1, sticky=tk.W)
-
             self.var_sync = tk.BooleanVar(value=c_sync)
             tk.Checkbutton(frame, text="Sync with Global History", variable=self.var_sync).grid(row=2, column=1, sticky=tk.W, pady=5)
 
@@ -119,8 +132,16 @@ class TVStationService:
         self.gui = gui_app
         self.running = False
         self.skip_flag = False
+        self._in_break = False
+        self._break_gaps = []
+        self._clip_ended_at = None
         self.current_meta = {"title": "Offline", "show": "", "percent": 0}
         self.gfx_engine = GraphicsEngine()
+        self.watcher = None
+        # Shared header cache for episodes, movies and commercials (durations, stream info)
+        self.probe = MediaProbe()
+        # Bookmarks and playback cursors (append-only, survives a crash)
+        self.journal = StateJournal()
         self.load_components()
         self.start_ipc_server()
 
@@ -143,6 +164,12 @@ class TVStationService:
                 "upcoming": upcoming
             }), 200
 
+        @app.route('/epg', methods=['GET'])
+        def get_epg():
+            days = min(int(request.args.get('days', 7)), 14)
+            guide = EPGGenerator(self.scheduler, self.comm_manager, self.probe).generate(days=days)
+            return jsonify(guide), 200
+
         @app.route('/skip', methods=['GET'])
         def skip_item():
             self.skip_current()
@@ -153,7 +180,8 @@ class TVStationService:
             data = request.json
             if self.scheduler and 'slot' in data:
                 insert_next = data.get('insert_next', True)
-                self.scheduler.inject_slot(data['slot'], insert_next)
+                try: self.scheduler.inject_slot(data['slot'], insert_next)
+                except ScheduleConfigError as e: return jsonify({"status": "rejected", "errors": e.errors}), 400
             return jsonify({"status": "injected"}), 200
 
         @app.route('/sync', methods=['POST'])
@@ -183,42 +211,101 @@ class TVStationService:
             
         if "blacklist" not in self.config: self.config["blacklist"] = []
             
-        scanner = InventoryManager()
-        self.library = {}
+        scanner = InventoryManager(workers=self.config.get("scan_workers", DEFAULT_CONFIG["scan_workers"]), compact=True)
+        # Warm start: folders whose mtime hasn't changed since the last export are not re-listed
+        # (the old JSON cache is only read once, to migrate to the SQLite store)
+        if not scanner.load_store(INVENTORY_DB): scanner.load_cache(INVENTORY_CACHE)
+
         tv_path = self.config['paths'].get('tv', '')
-        if tv_path and os.path.exists(tv_path):
-            self.library = scanner.scan_series(tv_path)
-        
-        self.movie_library = []
-        self.movie_map = {}
         mov_path = self.config['paths'].get('movies', '')
-        if mov_path and os.path.exists(mov_path):
-            self.movie_library = scanner.scan_movies(mov_path)
-            for m in self.movie_library: self.movie_map[os.path.basename(m)] = m
+        mv_path = self.config['paths'].get('music_videos', '')
+        comm_path = self.config['paths'].get('commercials', '')
+
+        # Scan every library root at the same time, each one spends most of its time waiting on the disk
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            tv_job = pool.submit(scanner.scan_series, tv_path) if tv_path and os.path.exists(tv_path) else None
+            mov_job = pool.submit(scanner.scan_movies, mov_path) if mov_path and os.path.exists(mov_path) else None
+            mv_job = pool.submit(scanner.scan_music_videos, mv_path) if mv_path and os.path.exists(mv_path) else None
+            rules = self.config.get("commercial_rules", DEFAULT_CONFIG["commercial_rules"])
+            comm_job = pool.submit(
+                CommercialManager, comm_path, self.probe, True,
+                min_separation=rules.get("min_separation_sec", 1800),
+                max_plays=rules.get("max_plays_per_window", 2),
+                cap_window=rules.get("window_sec", 3600)
+            ) if comm_path and os.path.exists(comm_path) else None
+
+        self.library = tv_job.result() if tv_job else {}
+
+        # Indexed by path and file name, shared with the scheduler and the GUI
+        self.movie_library = MediaPool(mov_job.result() if mov_job else [], "movies")
             
         # RESTORED: MUSIC VIDEO SCANNER
-        self.music_video_library = []
-        self.music_video_map = {}
-        mv_path = self.config['paths'].get('music_videos', '')
-        if mv_path and os.path.exists(mv_path):
-            # Using standard movie scan if scan_music_videos isn't updated in InventoryManager yet
-            self.music_video_library = scanner.scan_movies(mv_path) if not hasattr(scanner, 'scan_music_videos') else scanner.scan_music_videos(mv_path)
-            for mv in self.music_video_library: self.music_video_map[os.path.basename(mv)] = mv
+        self.music_video_library = MediaPool(mv_job.result() if mv_job else [], "music_videos")
 
-        comm_path = self.config['paths'].get('commercials', '')
-        if comm_path and os.path.exists(comm_path):
-            self.comm_manager = CommercialManager(comm_path)
+        scanner.export_store(INVENTORY_DB)
+
+        if comm_job:
+            self.comm_manager = comm_job.result()
         else:
             class DummyComm:
-                def generate_break(self, a, b): return []
+                def generate_break(self, a, b, tolerance=None): return BreakPlan()
             self.comm_manager = DummyComm()
         
         self.scheduler = ScheduleEngine(
             self.library, 
             movie_library=self.movie_library, 
             music_video_library=self.music_video_library,
-            config_file=CONFIG_FILE
+            config_file=CONFIG_FILE,
+            journal=self.journal,
+            probe=self.probe
+        )
+        self.report_config_errors()
+
+        # Restart the watcher on the (possibly new) paths, seeded with the scan we just did
+        if self.watcher: self.watcher.stop()
+        self.watcher = LibraryWatcher(
+            self.config['paths'],
+            self.apply_library_update,
+            interval=self.config.get("watch_interval_sec", DEFAULT_CONFIG["watch_interval_sec"]),
+            workers=scanner.workers,
+            seed_scanner=scanner,
+            store_path=INVENTORY_DB
         )
+        self.watcher.start()
+
+        # Warm the probe cache in the background with what the lookahead and the EPG will ask for
+        self.probe.prefetch(self._scheduled_media_paths())
+
+    def _scheduled_media_paths(self):
+        """
+        Episodes of the shows the channels schedule (anchors, time slots, rotation group members), files
+        pinned to a slot, and the music videos if a time-slot channel fills gaps with them. Not the whole
+        library: every prefetched file is a stat on each startup and an entry in the probe cache.
+        """
+        shows, paths, filler = set(), [], False
+        for compiled in self.scheduler.channels.values():
+            filler = filler or compiled.settings.timeslot
+            for slot in compiled.block + compiled.timeslots:
+                if slot.show: shows.add(slot.show)
+                if slot.group: shows.update(self.scheduler.rotation_groups.get(slot.group, []))
+                pinned = self.movie_library.resolve(slot.path) or self.music_video_library.resolve(slot.path)
+                if pinned: paths.append(pinned)
+        for show in shows:
+            for eps in self.library.get(show, {}).values(): paths.extend(eps)
+        if filler: paths.extend(self.music_video_library)
+        return paths
+
+    def apply_library_update(self, update):
+        """Called from the LibraryWatcher thread. Patches the live library without a reload."""
+        # The movie and music video pools are shared, the scheduler re-indexes them for everyone
+        changed_shows = self.scheduler.apply_library_update(update)
+
+        if changed_shows: print(f"DEBUG: Library updated: {', '.join(changed_shows)}")
+
+        new_files = [p for delta in update.get("deltas", {}).values() for p in delta.get("added", []) + [new for _, new in delta.get("moved", [])]]
+        if new_files: self.probe.prefetch(new_files)
+        # Tkinter isn't thread safe, let the UI thread redraw its lists
+        self.gui.root.after(0, self.gui.refresh_library_lists)
 
     def start_broadcast(self, window_id):
         if self.running: return
@@ -236,7 +323,25 @@ class TVStationService:
 
     def save_config(self):
         with open(CONFIG_FILE, 'w') as f: json.dump(self.config, f, indent=4)
-        if hasattr(self, 'scheduler'): self.scheduler.hot_reload()
+        if not hasattr(self, 'scheduler'): return True
+        known_errors = self.scheduler.config_errors
+        try: self.scheduler.hot_reload()
+        except ScheduleConfigError as e:
+            # The station keeps airing the last good schedule
+            print(f"DEBUG: Schedule not reloaded: {e}")
+            errors = "\n".join(e.errors)
+            self.gui.root.after(0, lambda: messagebox.showerror("Schedule Error", f"The schedule was saved but can't be aired:\n\n{errors}"))
+            return False
+        # Other channels with mistakes keep their last good schedule, the edit itself went through
+        self.report_config_errors(known_errors)
+        return True
+
+    def report_config_errors(self, known_errors=None):
+        """Pops up the scheduler's config_errors (channels that don't air as written), unless they were already shown."""
+        errors = self.scheduler.config_errors
+        if not errors or errors == known_errors: return
+        text = "\n".join(errors)
+        self.gui.root.after(0, lambda: messagebox.showwarning("Schedule Error", f"Some channels have errors and keep their last good schedule, or stay off the air until they're fixed:\n\n{text}"))
 
     def _get_random_bug_filter(self):
         bug_dir = os.path.join(app_dir, "assets", "bugs")
@@ -256,12 +361,35 @@ class TVStationService:
             player = mpv.MPV(
                 af='lavfi=[dynaudnorm=f=75:g=31:n=0:p=0.58]', wid=self.window_id,
                 input_default_bindings=True, input_vo_keyboard=True,
+                # Open the next playlist entry while the current one is still playing (gapless ad breaks)
+                prefetch_playlist=True,
                 log_handler=lambda level, prefix, text: print(f"MPV [{level}] {prefix}: {text}") if level in ['error', 'warning'] else None
             )
 
+            # Gap measurement: time from one clip ending to the next one showing its first frame
+            @player.event_callback('end-file')
+            def on_end_file(event):
+                self._clip_ended_at = time.perf_counter()
+
+            @player.event_callback('playback-restart')
+            def on_playback_restart(event):
+                if self._in_break and self._clip_ended_at is not None:
+                    self._break_gaps.append(time.perf_counter() - self._clip_ended_at)
+                self._clip_ended_at = None
+
+            # After a crash, pick the episode that was on air back up where it stopped
+            resume = self._take_resume_point()
+
             while self.running:
-                current_content = self.scheduler.get_next_item()
+                current_content = resume or self.scheduler.get_next_item()
+                resume = None
                 current_playlist = self._prepare_playlist(current_content)
+                if current_content['type'] == 'break':
+                    # Packed now, so the lookahead can plan from when the break really ends
+                    length = current_content['plan'].total
+                    if current_content.get('bumper', True): length += BUMPER_DURATION
+                    elif not current_playlist: length = current_content['min'] # Sat out, see _wait
+                    self.scheduler.set_on_air_until(time.time() + length)
                 
                 if current_content['type'] == 'video':
                     show_title = current_content.get('show', 'Unknown Show')
@@ -271,16 +399,10 @@ class TVStationService:
                     self.current_meta.update({"show": "Commercial Break", "title": "Messages"})
 
                 # --- BUMPER SEQUENCE ---
-                if current_content['type'] == 'break':
-                    real_comm_duration = 15 
-                    from tinytag import TinyTag
-                    for clip in current_playlist:
-                        try:
-                            tag = TinyTag.get(clip)
-                            if tag.duration: real_comm_duration += tag.duration
-                        except: real_comm_duration += 30 
-                            
-                    comm_duration = int(real_comm_duration)
+                # (Filler breaks on time-slot channels go straight to the ads)
+                if current_content['type'] == 'break' and current_content.get('bumper', True):
+                    # The break plan already knows every clip's length, nothing is read from disk here
+                    comm_duration = int(15 + current_content['plan'].total)
                     
                     active_chan = self.config.get("active_channel", "Default Channel")
                     chan_settings = self.config.get("channels", {}).get(active_chan, {}).get("settings", {})
@@ -350,7 +472,7 @@ class TVStationService:
                         except Exception as e: print(f"DEBUG: Station Bug Filter Error (Bumper): {e}")
 
                     bumper_start_time = time.time()
-                    bumper_duration = 29
+                    bumper_duration = BUMPER_DURATION
                     swapped_to_answer = False
                     
                     while not getattr(player, 'idle_active', True) and self.running:
@@ -386,9 +508,20 @@ class TVStationService:
                     except: pass
 
                 # --- PLAY CHUNK (Shows or Commercials) ---
+                if current_content['type'] == 'break':
+                    if current_playlist: self._play_break(player, current_playlist)
+                    # A time-slot gap with nothing to fill it (no commercials, or none fit): sit it out,
+                    # asking for the next item straight away would just get the same gap back
+                    elif not current_content.get('bumper', True): self._wait(current_content['min'])
+                    continue
+
                 for filepath in current_playlist:
                     if not self.running: break
-                    player.play(filepath)
+                    start_at = current_content.get('resume_at', 0)
+                    if start_at: player.loadfile(filepath, 'replace', start=str(int(start_at)))
+                    else: player.play(filepath)
+                    self._checkpoint(current_content, start_at)
+                    last_checkpoint = time.time()
                     time.sleep(0.5)
                     
                     # --- STREAMLINED MONITOR LOOP ---
@@ -410,13 +543,23 @@ class TVStationService:
                         
                         # 2. Update GUI Progress Bar
                         duration = player.duration if player.duration else 0
+                        curr_time = player.time_pos if player.time_pos else 0
                         if duration > 0:
-                            curr_time = player.time_pos if player.time_pos else 0
                             self.current_meta["percent"] = (curr_time / duration) * 100
+
+                        # 3. Checkpoint the position (one small journal append)
+                        if curr_time and time.time() - last_checkpoint >= CHECKPOINT_INTERVAL:
+                            self.journal.set(("now_playing", "time_pos"), round(curr_time, 1))
+                            self.journal.set(("now_playing", "at"), time.time())
+                            if duration: self.journal.set(("now_playing", "duration"), round(duration, 1))
+                            last_checkpoint = time.time()
                         
                         time.sleep(0.1)
 
-                    # 3. Log completed watch
+                    # Finished or skipped, there's nothing to resume any more
+                    if self.running: self.journal.set(("now_playing",), None)
+
+                    # 4. Log completed watch
                     if current_content['type'] == 'video' and not self.skip_flag and self.running:
                         self.update_history(current_content['show'], current_content['path'], "watched", 100)
 
@@ -428,13 +571,81 @@ class TVStationService:
                 except: pass
             self.current_meta = {"title": "Offline", "show": "", "percent": 0}
 
+    def _checkpoint(self, content, time_pos=0):
+        """Records what's on air, so a restart can resume it instead of moving on to the next item."""
+        if content['type'] != 'video' or not content.get('path'): return
+        item = {k: v for k, v in content.items() if k != 'resume_at'}
+        self.journal.set(("now_playing",), {"channel": self.config.get("active_channel"), "item": item, "time_pos": time_pos, "at": time.time()})
+
+    def _take_resume_point(self):
+        """Returns the item that was on air when the station last stopped (with resume_at set), or None."""
+        saved = self.journal.get("now_playing")
+        if not saved: return None
+        self.journal.set(("now_playing",), None)
+        item = saved.get("item") or {}
+        if saved.get("channel") != self.config.get("active_channel") or not os.path.exists(item.get("path") or ""): return None
+        # Only if it would still be on air by now, after a long outage the station moves on
+        remaining = saved["duration"] - saved.get("time_pos", 0) if saved.get("duration") else RESUME_WINDOW
+        if time.time() - saved.get("at", 0) > remaining:
+            print(f"DEBUG: Not resuming {os.path.basename(item['path'])}, it would have ended by now")
+            return None
+        # Back up a couple of seconds so the viewer sees where it left off
+        resume_at = max(0, saved.get("time_pos", 0) - 2)
+        if saved.get("duration"): self.scheduler.set_on_air_until(time.time() + saved["duration"] - resume_at)
+        print(f"DEBUG: Resuming {os.path.basename(item['path'])} at {resume_at:.0f}s")
+        return dict(item, resume_at=resume_at)
+
+    def _wait(self, seconds):
+        """Dead air for up to `seconds`, cut short by a skip or a stop."""
+        end = time.time() + seconds
+        while self.running and not self.skip_flag and time.time() < end: time.sleep(0.1)
+        self.skip_flag = False
+
+    def _play_break(self, player, clips):
+        """Hands the whole break to mpv as one playlist, so the next ad is already open when the current one ends."""
+        self._break_gaps = []
+        self._clip_ended_at = None
+        self._in_break = True
+        player.play(clips[0])
+        for clip in clips[1:]: player.playlist_append(clip)
+        time.sleep(0.5)
+
+        try:
+            while not getattr(player, 'idle_active', True) and self.running:
+                pos = player.playlist_pos
+
+                # 1. Skip moves on to the next ad, or ends the break on the last one
+                if self.skip_flag:
+                    self.skip_flag = False
+                    if pos is not None and pos < len(clips) - 1: player.playlist_next()
+                    else:
+                        player.command("stop")
+                        break
+
+                # 2. Update GUI Progress Bar for the clip that's on screen
+                duration = player.duration if player.duration else 0
+                if duration > 0:
+                    curr_time = player.time_pos if player.time_pos else 0
+                    self.current_meta["percent"] = (curr_time / duration) * 100
+
+                time.sleep(0.1)
+        finally:
+            self._in_break = False
+            # Drop leftover entries so the next show doesn't inherit them
+            try: player.playlist_clear()
+            except: pass
+
+        if self._break_gaps:
+            gaps_ms = [g * 1000 for g in self._break_gaps]
+            print(f"DEBUG: Break of {len(clips)} clips, gaps between clips: avg {sum(gaps_ms) / len(gaps_ms):.0f} ms, max {max(gaps_ms):.0f} ms")
+
     def _prepare_playlist(self, content):
         playlist = []
         if content['type'] == 'video':
             if content.get('path'): playlist.append(content['path'])
         elif content['type'] == 'break':
-            clips = self.comm_manager.generate_break(content['min'], content['max'])
-            playlist.extend(clips)
+            content['plan'] = self.comm_manager.generate_break(content['min'], content['max'], content.get('tolerance'))
+            playlist.extend(content['plan'].paths)
         return playlist
 
     def update_history(self, show, path, status, percent):
@@ -451,7 +662,7 @@ class TVStationService:
         }
         history["playback_log"][filename] = entry
         with open(HISTORY_FILE, 'w') as f: json.dump(history, f, indent=4)
-        self.scheduler.history = self.scheduler._load_json(HISTORY_FILE)
+        self.scheduler.record_play(path, entry)
 
 class StationManagerApp:
     def __init__(self, root):
@@ -480,8 +691,10 @@ class StationManagerApp:
             
             # 3. Hot-reload the engine just in case the actively playing channel was modified
             if hasattr(self.station, 'scheduler'):
+                known_errors = self.station.scheduler.config_errors
                 self.station.scheduler.config = self.station.config
                 self.station.scheduler.hot_reload()
+                self.station.report_config_errors(known_errors)
                 self.load_channel_data()
                 
             print("DEBUG: Successfully synced new channels from Discord Bot!")
@@ -608,7 +821,7 @@ class StationManagerApp:
         if not sel: return
         show_name = self.series_list.get(sel[0])
         series_data = self.station.library[show_name]
-        blacklist = self.station.config.get("blacklist", [])
+        blacklist = set(self.station.config.get("blacklist", []))
         playback_log = self.station.scheduler.history.get("playback_log", {})
         for i in self.ep_tree.get_children(): self.ep_tree.delete(i)
         for season_num in sorted(series_data.keys()):
@@ -751,14 +964,14 @@ class StationManagerApp:
         tk.Label(col1, text="🎬 Movies", font=("Arial", 9, "bold")).pack(anchor=tk.W, pady=(5,0))
         self.lst_source_movies = tk.Listbox(col1, height=4, exportselection=False)
         self.lst_source_movies.pack(fill=tk.X, padx=5)
-        if hasattr(self.station, 'movie_map'):
-            for m_name in sorted(self.station.movie_map.keys()): self.lst_source_movies.insert(tk.END, m_name)
+        if hasattr(self.station, 'movie_library'):
+            for m_name in self.station.movie_library.names(): self.lst_source_movies.insert(tk.END, m_name)
 
         tk.Label(col1, text="🎸 Music Videos", font=("Arial", 9, "bold")).pack(anchor=tk.W, pady=(5,0))
         self.lst_source_mvs = tk.Listbox(col1, height=4, exportselection=False)
         self.lst_source_mvs.pack(fill=tk.X, padx=5)
-        if hasattr(self.station, 'music_video_map'):
-            for mv_name in sorted(self.station.music_video_map.keys()): self.lst_source_mvs.insert(tk.END, mv_name)
+        if hasattr(self.station, 'music_video_library'):
+            for mv_name in self.station.music_video_library.names(): self.lst_source_mvs.insert(tk.END, mv_name)
             
         tk.Label(col1, text="⭐ Special Tokens", font=("Arial", 9, "bold")).pack(anchor=tk.W, pady=(5,0))
         self.lst_tokens = tk.Listbox(col1, height=2, exportselection=False)
@@ -810,6 +1023,9 @@ class StationManagerApp:
         tk.Label(col3, text="Max Duration (Seconds)", font=("Arial", 9, "bold")).pack(anchor=tk.W, pady=(10,0), padx=5)
         self.var_comm_max = tk.IntVar()
         tk.Entry(col3, textvariable=self.var_comm_max).pack(fill=tk.X, padx=5)
+        tk.Label(col3, text="Break Fit Tolerance (Seconds)", font=("Arial", 9, "bold")).pack(anchor=tk.W, pady=(10,0), padx=5)
+        self.var_comm_tol = tk.IntVar()
+        tk.Entry(col3, textvariable=self.var_comm_tol).pack(fill=tk.X, padx=5)
         tk.Button(col3, text="💾 SAVE CHANNEL", bg="green", fg="white", font=("Arial", 12, "bold"), height=2, command=self.save_full_schedule).pack(side=tk.BOTTOM, fill=tk.X, padx=10, pady=20)
         
         self.refresh_channel_dropdown()
@@ -847,8 +1063,9 @@ class StationManagerApp:
     def change_channel(self, event=None):
         new_channel = self.channel_var.get()
         self.station.config["active_channel"] = new_channel
+        # The channel's cursor is resident, so it picks up exactly where it was
+        self.station.scheduler.switch_channel(new_channel)
         self.station.save_config()
-        self.station.scheduler.hot_reload()
         self.load_channel_data()
 
     def load_channel_data(self):
@@ -861,13 +1078,14 @@ class StationManagerApp:
         self.var_comm_freq.set(settings.get("commercial_frequency", 3))
         self.var_comm_min.set(settings.get("commercial_min_sec", 60))
         self.var_comm_max.set(settings.get("commercial_max_sec", 120))
+        self.var_comm_tol.set(settings.get("commercial_tolerance_sec", 3))
         
         block = chan_data.get("schedule_block", [])
         for slot in block:
             s_type = slot.get("type", "anchor")
             name = ""
             count = slot.get("count", 1)
-            mode = slot.get("mode", "sequential")
+            mode = slot.get("mode", "random" if s_type in ["movie", "music_video"] else "sequential")
             sync_str = "Yes" if slot.get("sync_global", False) else "No"
             
             # FIX: Keep the full path so save_full_schedule doesn't corrupt it!
@@ -961,11 +1179,10 @@ class StationManagerApp:
             elif s_type == "rotate": slot["group"] = name
             elif s_type == "movie":
                 if name == "[Random Movie]": pass
-                elif name in self.station.movie_map: slot["path"] = self.station.movie_map[name]
+                elif name in self.station.movie_library.by_name: slot["path"] = self.station.movie_library.by_name[name]
             elif s_type == "music_video":
                 if name == "[Random Music Video]": pass
-                elif hasattr(self.station, 'music_video_map') and name in self.station.music_video_map: 
-                    slot["path"] = self.station.music_video_map[name]
+                elif name in self.station.music_video_library.by_name: slot["path"] = self.station.music_video_library.by_name[name]
 
             new_block.append(slot)
             
@@ -974,17 +1191,16 @@ class StationManagerApp:
         chan_data["settings"]["commercial_frequency"] = self.var_comm_freq.get()
         chan_data["settings"]["commercial_min_sec"] = self.var_comm_min.get()
         chan_data["settings"]["commercial_max_sec"] = self.var_comm_max.get()
+        chan_data["settings"]["commercial_tolerance_sec"] = self.var_comm_tol.get()
 
         # FIX: Ensure the config's active channel matches the one we just saved
         self.station.config["active_channel"] = active
-        self.station.save_config()
         
         # FIX: Hot reload the existing engine instead of destroying it!
   #      self.station.scheduler.hot_reload()
         
-        self.station.save_config()
-        # HOT RELOAD ENGAGED!
-        self.station.scheduler.hot_reload()
+        # HOT RELOAD ENGAGED! (save_config reloads the engine, and reports a schedule it can't air)
+        if not self.station.save_config(): return
         messagebox.showinfo("Success", f"Channel '{active}' updated and station reloaded!")
 
     def refresh_source_groups(self):
@@ -998,8 +1214,25 @@ class StationManagerApp:
     def refresh_app_data(self):
         with open(CONFIG_FILE, 'r') as f: self.station.config = json.load(f)
         self.refresh_source_groups()
-        self.station.scheduler.rotation_groups = self.station.config.get("rotation_groups", {})
-        self.station.scheduler._resolve_all_rotations()
+        self.station.scheduler.set_rotation_groups(self.station.config.get("rotation_groups", {}), self.station.config.get("rotation_weights", {}))
+
+    def refresh_library_lists(self):
+        """Redraws every list that shows library contents (after a rescan or a watcher update)."""
+        if not hasattr(self, 'series_list'): return
+        
+        self.lst_source_shows.delete(0, tk.END)
+        for s in sorted(self.station.library.keys()): self.lst_source_shows.insert(tk.END, s)
+        
+        self.lst_source_movies.delete(0, tk.END)
+        if hasattr(self.station, 'movie_library'):
+            for m_name in self.station.movie_library.names(): self.lst_source_movies.insert(tk.END, m_name)
+            
+        self.lst_source_mvs.delete(0, tk.END)
+        if hasattr(self.station, 'music_video_library'):
+            for mv_name in self.station.music_video_library.names(): self.lst_source_mvs.insert(tk.END, mv_name)
+            
+        self.series_list.delete(0, tk.END)
+        for s in sorted(self.station.library.keys()): self.series_list.insert(tk.END, s)
 
     def build_settings_tab(self):
         frame = tk.Frame(self.tab_settings, padx=20, pady=20)
@@ -1050,20 +1283,7 @@ class StationManagerApp:
             self.root.update() 
             self.station.load_components()
             self.refresh_source_groups() 
-            
-            self.lst_source_shows.delete(0, tk.END)
-            for s in sorted(self.station.library.keys()): self.lst_source_shows.insert(tk.END, s)
-            
-            self.lst_source_movies.delete(0, tk.END)
-            if hasattr(self.station, 'movie_map'):
-                for m_name in sorted(self.station.movie_map.keys()): self.lst_source_movies.insert(tk.END, m_name)
-                
-            self.lst_source_mvs.delete(0, tk.END)
-            if hasattr(self.station, 'music_video_map'):
-                for mv_name in sorted(self.station.music_video_map.keys()): self.lst_source_mvs.insert(tk.END, mv_name)
-                
-            self.series_list.delete(0, tk.END)
-            for s in sorted(self.station.library.keys()): self.series_list.insert(tk.END, s)
+            self.refresh_library_lists()
             
             messagebox.showinfo("Success", "Configuration saved and libraries rescanned!")
         except Exception as e:
@@ -1072,4 +1292,5 @@ class StationManagerApp:
 if __name__ == "__main__":
     root = tk.Tk()
     app = StationManagerApp(root)
-    root.mainloop()
\ No newline at end of file
+    root.mainloop()
+    app.station.journal.close()
\ No newline at end of file
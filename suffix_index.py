@@ -0,0 +1,80 @@
+import os
+import re
+
+# "S01E05", "s1.e5", "S01 E05" and "1x05" style episode tokens
+EPISODE_TOKEN = re.compile(r'(?:^|[^a-z0-9])s(\d{1,2})[ ._-]?e(\d{1,3})(?![0-9])|(?:^|[^a-z0-9])(\d{1,2})x(\d{2,3})(?![0-9])', re.IGNORECASE)
+SEPARATORS = re.compile(r'[\\/]+')
+
+def split_components(path):
+    """Path components, last first, case-folded (handles both \\ and / separators)."""
+    return [part.casefold() for part in reversed(SEPARATORS.split(path)) if part and part != "."]
+
+def episode_token(text):
+    """Returns (season, episode) for the first SxEE / NxNN token in text, or None."""
+    m = EPISODE_TOKEN.search(text)
+    if not m: return None
+    season, episode = (m.group(1), m.group(2)) if m.group(1) else (m.group(3), m.group(4))
+    return int(season), int(episode)
+
+
+class _Node:
+    __slots__ = ("children", "count", "sample")
+
+    def __init__(self):
+        self.children = None
+        self.count = 0
+        self.sample = [] # A few of the paths under this node, for ambiguity reports
+
+
+class SuffixIndex:
+    """
+    Trie over reversed path components, for resolving override_start values.
+
+    "Pilot.mkv", "Pilot", "Season 1/Pilot.mkv" and "D:\\Shows\\X\\Season 1\\Pilot.mkv" all walk the
+    trie from the file name up, one dict lookup per component, and "S01E01" / "1x01" go through a
+    token table. resolve() returns every match it found (capped) and the total count, so callers
+    can refuse an ambiguous override instead of guessing.
+    """
+    SAMPLE_SIZE = 5
+
+    def __init__(self, paths=()):
+        self.root = _Node()
+        self.tokens = {} # (season, episode) -> [paths]
+        for path in paths: self.add(path)
+
+    def add(self, path):
+        parts = split_components(path)
+        if not parts: return
+        self._insert(parts, path)
+        # Also reachable by the file name without its extension
+        stem = os.path.splitext(parts[0])[0]
+        if stem and stem != parts[0]: self._insert([stem] + parts[1:], path)
+        token = episode_token(parts[0])
+        if token: self.tokens.setdefault(token, []).append(path)
+
+    def _insert(self, parts, path):
+        node = self.root
+        for part in parts:
+            if node.children is None: node.children = {}
+            child = node.children.get(part)
+            if child is None:
+                child = node.children[part] = _Node()
+            node = child
+            node.count += 1
+            if len(node.sample) < self.SAMPLE_SIZE: node.sample.append(path)
+
+    def resolve(self, query):
+        """Returns (matches, total): up to SAMPLE_SIZE matching paths and how many there are in all."""
+        parts = split_components(os.path.normpath(query)) if query else []
+        node = self.root
+        for part in parts:
+            node = node.children.get(part) if node.children else None
+            if node is None: break
+        else:
+            if parts: return list(node.sample), node.count
+
+        token = episode_token(query) if query else None
+        if token and token in self.tokens:
+            matches = self.tokens[token]
+            return matches[:self.SAMPLE_SIZE], len(matches)
+        return [], 0
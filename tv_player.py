@@ -14,9 +14,11 @@ import tkinter as tk
 from PIL import Image, ImageTk
 
 from inventory_manager import InventoryManager
+from media_pool import MediaPool
 from schedule_engine import ScheduleEngine
 from commercial_manager import CommercialManager
 from graphics_engine import GraphicsEngine
+from media_probe import MediaProbe
 
 # Determine the absolute path of the application
 if getattr(sys, 'frozen', False):
@@ -92,14 +94,14 @@ def main(parent_gui=None):
     library = inventory.scan_series(config["paths"]["tv"])
     
     # Handle movies (optional based on your config)
-    movie_map = {}
+    movies = MediaPool(name="movies")
     if config["settings"].get("enable_movies", False):
-        movie_list = inventory.scan_movies(config["paths"]["movies"])
-        movie_map = {os.path.basename(m): m for m in movie_list} 
+        movies.replace(inventory.scan_movies(config["paths"]["movies"]))
 
     # --- 2. SETUP ENGINES & MPV PLAYER ---
-    schedule = ScheduleEngine(library, list(movie_map.values()))
-    comm_manager = CommercialManager(config["paths"]["commercials"])
+    probe = MediaProbe()
+    schedule = ScheduleEngine(library, movies)
+    comm_manager = CommercialManager(config["paths"]["commercials"], probe=probe)
 
     # Initialize MPV player
     # keep_open=True prevents the window from closing instantly when a video finishes
@@ -137,12 +139,7 @@ def main(parent_gui=None):
                 current_video_state["path"] = content['path']
                 current_video_state["start_time"] = time.time()
                 
-                from tinytag import TinyTag
-                try:
-                    tag = TinyTag.get(content['path'])
-                    current_video_state["duration"] = (tag.duration * 1000) if tag.duration else 1320000
-                except:
-                    current_video_state["duration"] = 1320000
+                current_video_state["duration"] = probe.duration(content['path'], 1320) * 1000
 
                 # --- PLAY THE VIDEO FIRST ---
                 player.play(content['path'])
@@ -187,9 +184,10 @@ def main(parent_gui=None):
                 except Exception:
                     pass 
 
-                clips = comm_manager.generate_break(content['min'], content['max'])
+                plan = comm_manager.generate_break(content['min'], content['max'])
+                print(f"  Break runtime: {int(plan.total)}s")
                 
-                for clip in clips:
+                for clip in plan.paths:
                     print(f"  Playing Ad: {os.path.basename(clip)}")
                     player.play(clip)
                     player.wait_for_playback()